@@ -1,12 +1,22 @@
 import sys
 import os
+import time
+_import_started = time.perf_counter()
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from flask import Flask, request, jsonify, render_template, send_from_directory
+import json
+import io
+import zipfile
+from flask import Flask, request, jsonify, render_template, send_from_directory, send_file, Response
 from flask_cors import CORS
 from similarity.text_analyzer import TextAnalyzer
 from similarity.code_analyzer import CodeAnalyzer
+from similarity.corpus import CorpusIndex
 from utils.file_processor import FileProcessor
 from utils.report_generator import ReportGenerator
+from utils.pipeline import AnalysisPipeline, CODE_TYPES
+from utils.jobs import JobStore, JobManager
+from utils.instrumentation import collect_timings, render_metrics, PDF_EXPORT_SECONDS
+from utils.profiling import ProfileStore, RequestProfiler
 from datetime import datetime
 from config import Config
 
@@ -20,45 +30,245 @@ text_analyzer = TextAnalyzer()
 code_analyzer = CodeAnalyzer()
 file_processor = FileProcessor()
 report_generator = ReportGenerator()
+corpus_index = CorpusIndex()
+pipeline = AnalysisPipeline(file_processor, text_analyzer, code_analyzer)
+job_store = JobStore()
+job_manager = JobManager(job_store)
+profile_store = ProfileStore()
+profiler = RequestProfiler(profile_store)
+
+if Config.PRELOAD_MODEL:
+    text_analyzer.cross_encoder.load()
+startup_seconds = time.perf_counter() - _import_started
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
 @app.route('/')
 def home():
     return render_template('index.html')
 
 @app.route('/analyze', methods=['POST'])
+@profiler.profiled
 def analyze():
     try:
         if 'file1' not in request.files or 'file2' not in request.files:
             return jsonify({'error': 'Please upload both files'}), 400
             
         file1, file2 = request.files['file1'], request.files['file2']
+        cascade = request.form.get('cascade', str(Config.TEXT_CASCADE)).lower() == 'true'
+        
+        with collect_timings() as timings:
+            payload = pipeline.run(file1, file2, cascade=cascade)
+        if request.values.get('timings', 'false').lower() == 'true':
+            payload['timings'] = timings
+        return jsonify(payload)
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    try:
+        if 'file1' not in request.files or 'file2' not in request.files:
+            return jsonify({'error': 'Please upload both files'}), 400
+        
+        file1, file2 = request.files['file1'], request.files['file2']
+        if not (file_processor._allowed_file(file1.filename) and file_processor._allowed_file(file2.filename)):
+            return jsonify({'success': False, 'error': 'Unsupported file type'}), 400
+        
+        job_id = job_manager.submit(file1, file2)
+        return jsonify({'success': True, 'job_id': job_id, 'status_url': f'/jobs/{job_id}'}), 202
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    def stream():
+        last = None
+        changed = time.monotonic()
+        while True:
+            job = job_store.get(job_id)
+            if job is None:
+                yield f"event: error\ndata: {json.dumps({'error': 'Unknown job'})}\n\n"
+                return
+            if (job['status'], job['stage']) != last:
+                last = (job['status'], job['stage'])
+                changed = time.monotonic()
+                yield f"data: {json.dumps(job)}\n\n"
+            if job['status'] in ('finished', 'failed'):
+                return
+            if time.monotonic() - changed > Config.JOB_EVENTS_TIMEOUT:
+                # The job has not moved in too long, e.g. its process was killed; stop streaming
+                yield f"event: timeout\ndata: {json.dumps(job)}\n\n"
+                return
+            time.sleep(Config.JOB_POLL_INTERVAL)
+    return Response(stream(), mimetype='text/event-stream')
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if job['status'] == 'failed':
+        return jsonify({'success': False, 'error': job['error']}), 400
+    if job['status'] != 'finished':
+        return jsonify({'success': False, 'status': job['status'], 'stage': job['stage']}), 409
+    return jsonify(job_store.result(job_id))
+
+@app.route('/corpus/documents', methods=['POST'])
+def corpus_add():
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'Please upload a file'}), 400
+        
+        file = request.files['file']
+        content, file_type = file_processor.process_file(file)
+        if file_type in CODE_TYPES:
+            # Reject sources that cannot be parsed now rather than failing every query that retrieves them
+            code_analyzer.validate(content, file_type)
+        doc_id = corpus_index.add(content, file.filename, file_type)
+        
+        return jsonify({
+            'success': True,
+            'document_id': doc_id,
+            'file_name': file.filename,
+            'type': file_type,
+            'corpus_size': len(corpus_index)
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/corpus/query', methods=['POST'])
+def corpus_query():
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'Please upload a file'}), 400
         
-        content1, content2, file_type = file_processor.process_files(file1, file2)
+        file = request.files['file']
+        content, file_type = file_processor.process_file(file)
+        if file_type in CODE_TYPES:
+            code_analyzer.validate(content, file_type)
+        top_k = request.form.get('top_k', Config.CORPUS_TOP_K, type=int)
+        # Most corpus candidates are unrelated, so text pairs stop at the cheapest tier that shows it
+        cascade = request.form.get('cascade', 'true').lower() == 'true'
         
-        if file_type in ('python', 'java', 'cpp'):
-            results = code_analyzer.compare(content1, content2, file_type)
-        else:
-            results = text_analyzer.compare(content1, content2)
+        # Only the LSH candidates go through the full pairwise pipeline, scored together
+        # so their semantic scores share cross-encoder batches
+        matched = corpus_index.query(content, file_type, top_k)
+        scored = pipeline.compare_many([(content, c['content'], file_type) for c in matched], cascade=cascade)
+        candidates = []
+        for candidate, results in zip(matched, scored):
+            entry = {
+                'document_id': candidate['document_id'],
+                'file_name': candidate['name'],
+                'estimated_similarity': candidate['estimated_similarity'],
+                'results': results
+            }
+            if isinstance(results, Exception):
+                # Only this candidate failed, e.g. a document stored before sources were validated
+                entry.update(results=None, error=str(results))
+            candidates.append(entry)
+        candidates.sort(key=lambda c: c['results']['score'] if c['results'] else -1.0, reverse=True)
+        
+        if request.form.get('ingest', 'false').lower() == 'true':
+            corpus_index.add(content, file.filename, file_type)
         
         return jsonify({
             'success': True,
-            'results': results,
-            'file1_name': file1.filename,
-            'file2_name': file2.filename,
-            'file1_preview': content1[:500] + ('...' if len(content1) > 500 else ''),
-            'file2_preview': content2[:500] + ('...' if len(content2) > 500 else ''),
-            'timestamp': datetime.now().isoformat(),
-            'type': file_type
+            'file_name': file.filename,
+            'type': file_type,
+            'corpus_size': len(corpus_index),
+            'candidates': candidates,
+            'timestamp': datetime.now().isoformat()
         })
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
+@app.route('/ready')
+def ready():
+    model = text_analyzer.cross_encoder
+    # Without preloading the model loads on the first text comparison, so the
+    # worker can serve (and must be sent) traffic before it is loaded
+    accepting = model.loaded or not Config.PRELOAD_MODEL
+    status = {
+        'ready': accepting,
+        'model_loaded': model.loaded,
+        'model': model.name,
+        'model_load_seconds': model.load_seconds,
+        'startup_seconds': startup_seconds,
+        'pid': os.getpid(),
+        'max_rss_mb': max_rss_mb()
+    }
+    return jsonify(status), 200 if accepting else 503
+
+@app.route('/metrics')
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/profiles')
+def list_profiles():
+    return jsonify({'enabled': profiler.enabled, 'slow_seconds': profiler.slow_seconds, 'profiles': profile_store.list()})
+
+@app.route('/profiles/<capture_id>')
+def download_profile(capture_id):
+    path = profile_store.path(capture_id)
+    if path is None:
+        return jsonify({'error': 'Unknown profile'}), 404
+    return send_from_directory(os.path.abspath(profile_store.folder), os.path.basename(path), as_attachment=True)
+
+@app.route('/inference/stats')
+def inference_stats():
+    return jsonify(text_analyzer.semantic_scheduler.stats())
+
 @app.route('/export/pdf', methods=['POST'])
+@profiler.profiled
 def export_pdf():
     try:
         data = request.json
-        pdf_path = report_generator.generate(data)
-        return send_from_directory(os.path.dirname(pdf_path), os.path.basename(pdf_path), as_attachment=True)
+        start = time.perf_counter()
+        pdf = report_generator.generate(data)
+        PDF_EXPORT_SECONDS.observe(time.perf_counter() - start)
+        return send_file(io.BytesIO(pdf), mimetype='application/pdf', as_attachment=True,
+                         download_name=f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf")
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/export/pdf/batch', methods=['POST'])
+def export_pdf_batch():
+    """Render a list of analysis payloads, e.g. a whole class, into one zip of PDFs"""
+    try:
+        payloads = request.json
+        if not isinstance(payloads, list):
+            return jsonify({'error': 'Expected a list of analysis results'}), 400
+        start = time.perf_counter()
+        reports = report_generator.generate_many(payloads)
+        PDF_EXPORT_SECONDS.observe(time.perf_counter() - start)
+
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for i, (data, pdf) in enumerate(zip(payloads, reports), 1):
+                name1 = os.path.splitext(data.get('file1_name', 'file1'))[0]
+                name2 = os.path.splitext(data.get('file2_name', 'file2'))[0]
+                zf.writestr(f"report_{i:03d}_{name1}_vs_{name2}.pdf", pdf)
+        archive.seek(0)
+        return send_file(archive, mimetype='application/zip', as_attachment=True,
+                         download_name=f"reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip")
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
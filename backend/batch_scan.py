@@ -0,0 +1,291 @@
+"""Compare a whole assignment's submissions offline, without the web server.
+
+Run from the backend directory:
+
+    python batch_scan.py submissions/ --output results.jsonl
+    python batch_scan.py manifest.txt --target submissions/alice.py --format csv --output alice.csv
+    python batch_scan.py submissions/ --output results.jsonl --resume
+    python batch_scan.py submissions/ --output flagged.jsonl --matrix
+
+Every file is extracted once; pairs are then compared on a process pool and
+each result is appended to the output as soon as its chunk finishes. The
+output doubles as the checkpoint: with --resume, pairs already in it are
+skipped.
+
+With --matrix, all pairs are first screened at once (text with a sparse
+similarity matrix, code with MinHash over normalized token k-grams), the
+suspicious ones are clustered into groups, and only those pairs get the
+detailed per-pair analysis.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import argparse
+import csv
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from werkzeug.datastructures import FileStorage
+from config import Config
+from utils.file_processor import FileProcessor
+from utils.pipeline import AnalysisPipeline, CODE_TYPES
+
+CSV_FIELDS = ['file1', 'file2', 'type', 'score', 'details', 'error']
+
+def find_submissions(source):
+    """Submission paths from a directory (searched recursively) or a manifest listing one path per line"""
+    if os.path.isdir(source):
+        paths = []
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            paths.extend(os.path.join(root, name) for name in sorted(files) if _allowed(name))
+        return paths
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source) as f:
+        lines = [line.strip() for line in f]
+    return [os.path.join(base, line) for line in lines if line and not line.startswith('#')]
+
+def _allowed(name):
+    return '.' in name and name.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
+
+def extract(path):
+    """Worker task: (text, file type), or raise ValueError for unreadable files"""
+    with open(path, 'rb') as f:
+        return _state['processor'].process_file(FileStorage(stream=f, filename=os.path.basename(path)))
+
+def make_pairs(count, target=None):
+    """Index pairs in row order, so a chunk keeps reusing one document's parsed form"""
+    if target is not None:
+        return [(target, j) for j in range(count) if j != target]
+    return [(i, j) for i in range(count) for j in range(i + 1, count)]
+
+def pair_type(doc1, doc2):
+    # Same rule as FileProcessor.process_files: mixed extensions are compared as text
+    return doc1['type'] if doc1['ext'] == doc2['ext'] else 'text'
+
+def screen(documents, target=None, threshold=Config.CASCADE_DETAILED_THRESHOLD,
+           code_threshold=Config.CODE_SCREEN_THRESHOLD):
+    """Flagged index pairs from similarity screening, and the clusters they form.
+
+    Text pairs go through the text cascade's cheap tiers on one similarity
+    matrix. Code pairs are screened per extension by MinHash over k-grams of
+    their normalized tokens instead: normalized programs share nearly all of
+    their words, so the text metrics would flag almost every pair. Code that
+    cannot be lexed is screened as text.
+    """
+    import numpy as np
+    from similarity.similarity_matrix import SimilarityMatrix, minhash_pairs, cluster_pairs
+    from similarity.code_tokens import code_shingles
+    from similarity.minhash import get_signer
+    code, unlexed = {}, set()
+    for i, doc in enumerate(documents):
+        if doc['type'] in CODE_TYPES:
+            try:
+                code.setdefault(doc['ext'], {})[i] = get_signer().signature(code_shingles(doc['content'], doc['type']))
+            except Exception:
+                unlexed.add(i)
+    flagged = []
+    for signatures in code.values():
+        members = list(signatures)
+        stacked = np.vstack([signatures[i] for i in members])
+        flagged += [(members[a], members[b], score) for a, b, score in minhash_pairs(stacked, code_threshold)]
+
+    # Documents in any text pair: mixed extensions are compared as text, and so are unlexable files
+    mixed = len({doc['ext'] for doc in documents}) > 1
+    unlexed_exts = {documents[i]['ext'] for i in unlexed}
+    text = [i for i, doc in enumerate(documents)
+            if doc['type'] not in CODE_TYPES or mixed or doc['ext'] in unlexed_exts]
+    if len(text) > 1:
+        for a, b, scores in SimilarityMatrix([documents[i]['content'] for i in text]).pairs(threshold):
+            i, j = text[a], text[b]
+            if pair_type(documents[i], documents[j]) == 'text' or i in unlexed or j in unlexed:
+                flagged.append((i, j, scores['cosine']))
+    flagged.sort()
+    if target is not None:
+        flagged = [(target, j if i == target else i, score) for i, j, score in flagged if target in (i, j)]
+    clusters = [
+        dict(cluster, members=[documents[i]['name'] for i in cluster['members']])
+        for cluster in cluster_pairs(flagged, len(documents))
+    ]
+    return [(i, j) for i, j, _ in flagged], clusters
+
+# Per-process state, set up once by the pool initializer
+_state = {}
+
+def _init_worker(documents=None, cascade=True, full=False):
+    from similarity.text_analyzer import TextAnalyzer
+    from similarity.code_analyzer import CodeAnalyzer
+    # The scan's pool already uses every core; a worker's own PDF and C++ pools would oversubscribe it
+    _state['processor'] = FileProcessor(workers=1)
+    _state['pipeline'] = AnalysisPipeline(_state['processor'], TextAnalyzer(), CodeAnalyzer(cpp_workers=1))
+    _state['documents'] = documents
+    _state['cascade'] = cascade
+    _state['full'] = full
+
+def compare_chunk(pairs):
+    """Worker task: compare a chunk of index pairs and return one record per pair"""
+    documents = _state['documents']
+    items, records = [], []
+    for i, j in pairs:
+        doc1, doc2 = documents[i], documents[j]
+        file_type = pair_type(doc1, doc2)
+        items.append((doc1['content'], doc2['content'], file_type))
+        records.append({'file1': doc1['name'], 'file2': doc2['name'], 'type': file_type})
+    # The whole chunk at once, so its detailed-tier pairs share cross-encoder batches;
+    # a pair that fails comes back as its exception
+    scored = _state['pipeline'].compare_many(items, cascade=_state['cascade'])
+    for record, results in zip(records, scored):
+        if isinstance(results, Exception):
+            record.update(score=None, details={}, error=str(results))
+            continue
+        record.update(score=results['score'], details=results['details'])
+        if _state['full']:
+            record['results'] = results
+        if results.get('error'):
+            record['error'] = results['error']
+    return records
+
+class ResultWriter:
+    """Appends records as JSON lines or CSV rows and reports which pairs are already done"""
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self._file = None
+        self._csv = None
+
+    def completed(self):
+        if not os.path.exists(self.path):
+            return set()
+        self._drop_partial_line()
+        done = set()
+        with open(self.path, newline='') as f:
+            rows = csv.DictReader(f) if self.fmt == 'csv' else (json.loads(line) for line in f if line.strip())
+            for row in rows:
+                done.add((row['file1'], row['file2']))
+        return done
+
+    def open(self, append):
+        exists = append and os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        self._file = open(self.path, 'a' if append else 'w', newline='')
+        if self.fmt == 'csv':
+            self._csv = csv.DictWriter(self._file, CSV_FIELDS, extrasaction='ignore')
+            if not exists:
+                self._csv.writeheader()
+        return self
+
+    def write(self, records):
+        for record in records:
+            if self.fmt == 'csv':
+                self._csv.writerow(dict(record, details=json.dumps(record['details'])))
+            else:
+                self._file.write(json.dumps(record) + '\n')
+        # Flush per chunk so an interrupted run loses at most the chunks in flight
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+    def _drop_partial_line(self):
+        """A run killed mid-write can leave half a record; cut the file back to the last newline"""
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+def scan(paths, output, fmt='jsonl', target=None, resume=False, workers=Config.BATCH_WORKERS,
+         chunk_size=Config.BATCH_CHUNK_SIZE, cascade=True, full=False, matrix=False, clusters_path=None,
+         log=sys.stderr):
+    """Extract every path once, compare the pairs on a process pool and stream records to `output`"""
+    start = time.perf_counter()
+    if target is not None and os.path.abspath(target) not in map(os.path.abspath, paths):
+        paths = paths + [target]
+    root = os.path.commonpath([os.path.abspath(p) for p in paths]) if len(paths) > 1 else ''
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        extracted = list(pool.map(_try_extract, paths))
+    target_abs = os.path.abspath(target) if target is not None else None
+    documents, failed, target_index = [], [], None
+    for path, (content, file_type, error) in zip(paths, extracted):
+        name = os.path.relpath(os.path.abspath(path), root) if root else path
+        if error:
+            failed.append(name)
+            print(f"Skipping {name}: {error}", file=log)
+            continue
+        if os.path.abspath(path) == target_abs:
+            target_index = len(documents)
+        documents.append({'name': name, 'ext': os.path.splitext(path)[1].lower(), 'content': content, 'type': file_type})
+    if target is not None and target_index is None:
+        raise ValueError(f"Target {target} could not be extracted")
+
+    writer = ResultWriter(output, fmt)
+    done = writer.completed() if resume else set()
+    print(f"{len(documents)} documents extracted, {len(failed)} skipped", file=log)
+    if matrix:
+        candidates, clusters = screen(documents, target_index)
+        with open(clusters_path or os.path.splitext(output)[0] + '.clusters.json', 'w') as f:
+            json.dump(clusters, f, indent=2)
+        print(f"Screening flagged {len(candidates)} pairs in {len(clusters)} groups", file=log)
+    else:
+        candidates = make_pairs(len(documents), target_index)
+    pairs = [(i, j) for i, j in candidates
+             if (documents[i]['name'], documents[j]['name']) not in done
+             and (documents[j]['name'], documents[i]['name']) not in done]
+    print(f"{len(pairs)} pairs to compare ({len(done)} already done)", file=log)
+
+    compared = 0
+    writer.open(append=resume)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(documents, cascade, full)) as pool:
+            futures = [pool.submit(compare_chunk, pairs[k:k + chunk_size]) for k in range(0, len(pairs), chunk_size)]
+            for future in as_completed(futures):
+                records = future.result()
+                writer.write(records)
+                compared += len(records)
+                print(f"\r{compared}/{len(pairs)} pairs", end='', file=log, flush=True)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    print(f"\nCompared {compared} pairs in {elapsed:.1f}s", file=log)
+    return {'documents': len(documents), 'skipped': failed, 'compared': compared, 'seconds': elapsed}
+
+def _try_extract(path):
+    try:
+        content, file_type = extract(path)
+        return content, file_type, None
+    except Exception as e:
+        return None, None, str(e)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source', help='directory of submissions, or a manifest with one path per line')
+    parser.add_argument('--output', required=True, help='results file, appended to as pairs finish')
+    parser.add_argument('--format', choices=('jsonl', 'csv'), help='default: from the output extension')
+    parser.add_argument('--target', help='compare only this submission against all the others')
+    parser.add_argument('--resume', action='store_true', help='skip pairs already in the output')
+    parser.add_argument('--workers', type=int, default=Config.BATCH_WORKERS,
+                        help='worker processes; each loads its own cross-encoder once a pair reaches the detailed tier')
+    parser.add_argument('--chunk-size', type=int, default=Config.BATCH_CHUNK_SIZE, help='pairs per worker task')
+    parser.add_argument('--no-cascade', action='store_true', help='run every text metric on every pair')
+    parser.add_argument('--full', action='store_true', help='include heatmaps and matches in each record')
+    parser.add_argument('--matrix', action='store_true',
+                        help='screen all pairs at once and only analyze the flagged ones')
+    parser.add_argument('--clusters', help='where --matrix writes the flagged groups (default: <output>.clusters.json)')
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ('csv' if args.output.lower().endswith('.csv') else 'jsonl')
+    if args.full and fmt == 'csv':
+        parser.error('--full needs JSONL output')
+    paths = find_submissions(args.source)
+    if len(paths) + (1 if args.target else 0) < 2:
+        parser.error('need at least two submissions')
+    scan(paths, args.output, fmt, args.target, args.resume, args.workers, args.chunk_size,
+         cascade=not args.no_cascade, full=args.full, matrix=args.matrix, clusters_path=args.clusters)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
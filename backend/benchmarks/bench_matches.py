@@ -0,0 +1,72 @@
+"""Benchmark the winnowing match finder against the legacy window scan.
+
+Run from the backend directory:  python -m benchmarks.bench_matches
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+import random
+import time
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from similarity.match_finder import MatchFinder
+
+WORDS = (
+    "analysis data model result method system student research value process "
+    "theory sample study effect level function structure approach table figure "
+    "report source question section evidence argument context problem solution"
+).split()
+
+def legacy_find_matches(text1, text2, threshold=0.7):
+    """The original quadratic scan: one TF-IDF fit per pair of 100-char sections"""
+    def cosine(a, b):
+        vectorizer = TfidfVectorizer(ngram_range=(1, 3), token_pattern=r"(?u)\\b\\w+\\b|[A-Za-z_][A-Za-z0-9_]*|\\S")
+        try:
+            tfidf = vectorizer.fit_transform([a, b])
+            return cosine_similarity(tfidf[0], tfidf[1])[0][0]
+        except ValueError:
+            return 0.0
+
+    matches = []
+    for i in range(0, len(text1), 50):
+        for j in range(0, len(text2), 50):
+            similarity = cosine(text1[i:i+100], text2[j:j+100])
+            if similarity > threshold:
+                matches.append((i, j, similarity))
+    return matches
+
+def make_pair(size, copied=0.3, seed=0):
+    """Two random essays of roughly `size` chars sharing a `copied` fraction"""
+    rng = random.Random(seed)
+    def essay(n):
+        words = []
+        while sum(len(w) + 1 for w in words) < n:
+            words.append(rng.choice(WORDS))
+        return ' '.join(words)
+    text1 = essay(size)
+    text2 = essay(size)
+    span = int(size * copied)
+    start1, start2 = rng.randrange(size - span), rng.randrange(size - span)
+    text2 = text2[:start2] + text1[start1:start1+span] + text2[start2+span:]
+    return text1, text2
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+def main(sizes=(1000, 4000, 16000, 200000), legacy_limit=4000):
+    finder = MatchFinder()
+    print(f"{'size':>8} {'winnowing (s)':>14} {'matches':>8} {'legacy (s)':>11} {'matches':>8}")
+    for size in sizes:
+        text1, text2 = make_pair(size)
+        new_time, new_matches = timed(finder.find, text1, text2)
+        if size <= legacy_limit:
+            old_time, old_matches = timed(legacy_find_matches, text1, text2)
+            legacy = f"{old_time:>11.3f} {len(old_matches):>8}"
+        else:
+            legacy = f"{'skipped':>11} {'-':>8}"
+        print(f"{size:>8} {new_time:>14.4f} {len(new_matches):>8} {legacy}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Measure worker startup time and memory with lazy vs preloaded model loading.
+
+Run from the backend directory:  python -m benchmarks.bench_startup
+"""
+import json
+import os
+import subprocess
+import sys
+
+PROBE = """
+import json, resource, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+rss_imported = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+app.text_analyzer.cross_encoder.load()
+print(json.dumps({
+    'import_seconds': imported,
+    'rss_after_import_mb': rss_imported,
+    'model_load_seconds': app.text_analyzer.cross_encoder.load_seconds,
+    'rss_after_load_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+}))
+"""
+
+def probe(preload):
+    backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    env = dict(os.environ, PRELOAD_MODEL='1' if preload else '0')
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=backend_dir, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    for preload in (False, True):
+        result = probe(preload)
+        mode = 'preload' if preload else 'lazy'
+        print(f"{mode:>8}: import {result['import_seconds']:.2f}s "
+              f"({result['rss_after_import_mb']:.0f} MB), "
+              f"model ready after {result['model_load_seconds'] or 0:.2f}s load "
+              f"({result['rss_after_load_mb']:.0f} MB)")
+
+if __name__ == '__main__':
+    main()
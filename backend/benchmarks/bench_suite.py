@@ -0,0 +1,208 @@
+"""Time every analyzer hot path on the synthetic corpus and check for regressions.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_suite                       # time everything, write bench_results.json
+    python -m benchmarks.bench_suite --save-baseline       # also store the run as the baseline
+    python -m benchmarks.bench_suite --baseline benchmarks/baseline.json --threshold 0.25
+
+With a baseline, any benchmark whose median is more than `threshold` slower
+(and at least --min-seconds slower) is reported, and the exit status is 1.
+The semantic metric is not benchmarked: it depends on the model download.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+import argparse
+import io
+import json
+import platform
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from benchmarks.corpus_generator import text_pair, python_pair, java_pair, pdf_bytes
+from similarity.artifacts import DocumentArtifacts
+from similarity.code_analyzer import CodeAnalyzer
+from similarity.code_tokens import lex, normalize_code
+from similarity.parsed_source import ParsedSource, JavaSource
+from similarity.substring import SuffixAutomaton
+from similarity.text_analyzer import TextAnalyzer
+from utils.file_processor import FileProcessor
+from utils.report_generator import ReportGenerator
+
+SIZES = (1000, 10000, 100000, 1000000)
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+class Suite:
+    """Benchmarks as name -> (setup(size) returning a zero-argument run, largest size).
+
+    Paths that are superlinear on the generator's highly repetitive code are
+    capped at 100 KB so a full run stays in minutes.
+    """
+    def __init__(self, workdir):
+        self.workdir = workdir
+        self.text_analyzer = TextAnalyzer()
+        self.code_analyzer = CodeAnalyzer()
+        self.benchmarks = {
+            'text.jaccard': (self._text(lambda d1, d2: self.text_analyzer._jaccard_similarity(d1, d2)), None),
+            'text.minhash': (self._text(lambda d1, d2: self.text_analyzer._minhash_similarity(d1, d2)), None),
+            'text.cosine': (self._text(lambda d1, d2: self.text_analyzer._cosine_similarity(d1, d2)), None),
+            'text.heatmap': (self._text(lambda d1, d2: self.text_analyzer._generate_heatmap(d1.normalized, d2.normalized)), None),
+            'text.levenshtein': (self._raw_text(self.text_analyzer.edit_distance.compare), None),
+            'text.longest_match': (self._raw_text(self.text_analyzer._common_substrings), None),
+            'text.suffix_automaton': (self._raw_text(lambda t1, t2: SuffixAutomaton(t1).common_substrings(t2)), 100000),
+            'text.find_matches': (self._raw_text(self.text_analyzer._find_matches), None),
+            'python.parse': (self._parse(python_pair, ParsedSource), None),
+            'python.compare_ast': (self._code(python_pair, ParsedSource, self._compare_ast), None),
+            'python.compare_logic': (self._code(python_pair, ParsedSource, self.code_analyzer._compare_logic), 100000),
+            'python.token_tiling': (self._code(python_pair, ParsedSource, self._tile), 100000),
+            'java.parse': (self._parse(java_pair, JavaSource), 100000),
+            'java.compare_ast': (self._code(java_pair, JavaSource, self._compare_ast), 100000),
+            'java.compare_logic': (self._code(java_pair, JavaSource, self.code_analyzer._compare_logic), 100000),
+            'pdf.extract': (self._pdf, 100000),
+            'report.generate': (self._report, 1000),
+        }
+
+    def _text(self, metric):
+        """Metrics over document artifacts; fresh artifacts each run so derivation is timed too"""
+        def setup(size):
+            text1, text2 = text_pair(size, 'paraphrase')
+            return lambda: metric(DocumentArtifacts(text1), DocumentArtifacts(text2))
+        return setup
+
+    def _raw_text(self, metric):
+        def setup(size):
+            text1, text2 = text_pair(size, 'copy')
+            return lambda: metric(text1, text2)
+        return setup
+
+    def _parse(self, make_pair, source_class):
+        def setup(size):
+            code, _ = make_pair(size, 'renamed')
+            def run():
+                lex.cache_clear()
+                normalize_code.cache_clear()
+                return source_class(code)
+            return run
+        return setup
+
+    def _code(self, make_pair, source_class, metric):
+        def setup(size):
+            code1, code2 = make_pair(size, 'renamed')
+            source1, source2 = source_class(code1), source_class(code2)
+            return lambda: metric(source1, source2)
+        return setup
+
+    def _compare_ast(self, source1, source2):
+        return self.code_analyzer._compare_ast(source1.subtrees, source2.subtrees)
+
+    def _tile(self, source1, source2):
+        return self.code_analyzer._find_code_matches(source1.tokens, source2.tokens)
+
+    def _pdf(self, size):
+        data = pdf_bytes(size)
+        def run():
+            # A fresh cache folder each run, so extraction is never a cache hit
+            processor = FileProcessor(cache_folder=os.path.join(self.workdir, uuid.uuid4().hex))
+            return processor._read_pdf(io.BytesIO(data))
+        return run
+
+    def _report(self, size):
+        text1, text2 = text_pair(size, 'copy')
+        payload = {
+            'success': True,
+            'results': {
+                'details': {'jaccard': 0.4, 'cosine': 0.5, 'levenshtein': 0.3, 'minhash': 0.35, 'longest_match': 0.1},
+                'score': 0.4,
+                'heatmap': [[0.5] * 20 for _ in range(20)],
+                'matches': self.text_analyzer._find_matches(text1, text2)
+            },
+            'file1_name': 'essay1.txt',
+            'file2_name': 'essay2.txt',
+            'file1_preview': text1[:500],
+            'file2_preview': text2[:500],
+            'timestamp': datetime.now().isoformat(),
+            'type': 'text'
+        }
+        generator = ReportGenerator()
+        return lambda: generator.render(payload)
+
+def time_benchmark(run, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        runs.append(time.perf_counter() - start)
+    return {'seconds': statistics.median(runs), 'runs': runs}
+
+def run_suite(sizes=SIZES, repeat=3, only=None):
+    with tempfile.TemporaryDirectory() as workdir:
+        suite = Suite(workdir)
+        results = {}
+        for name, (setup, max_size) in suite.benchmarks.items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            for size in sizes:
+                if max_size and size > max_size:
+                    continue
+                key = f"{name}@{size}"
+                results[key] = time_benchmark(setup(size), repeat)
+                print(f"{key:>32} {results[key]['seconds']:>10.4f}s", flush=True)
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat
+        },
+        'results': results
+    }
+
+def compare(current, baseline, threshold=0.25, min_seconds=0.005):
+    """Benchmarks slower than baseline by more than `threshold` (relative) and `min_seconds` (absolute)"""
+    regressions = []
+    for key, result in current['results'].items():
+        if key not in baseline['results']:
+            continue
+        old, new = baseline['results'][key]['seconds'], result['seconds']
+        if new > old * (1 + threshold) and new - old > min_seconds:
+            regressions.append({'benchmark': key, 'baseline': old, 'current': new, 'ratio': new / old})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='document sizes in characters')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', help='benchmark name prefixes, e.g. text. python.compare_ast')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed relative slowdown')
+    parser.add_argument('--min-seconds', type=float, default=0.005, help='ignore slowdowns smaller than this')
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.sizes, args.repeat, args.only)
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.threshold, args.min_seconds)
+    for r in regressions:
+        print(f"REGRESSION {r['benchmark']}: {r['baseline']:.4f}s -> {r['current']:.4f}s ({r['ratio']:.2f}x)")
+    if not regressions:
+        print("No regressions against baseline")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Deterministic synthetic plagiarism corpus for the benchmarks.
+
+Every generator takes a target size in characters and a seed, and returns the
+same pair for the same arguments.
+"""
+import random
+
+WORDS = (
+    "analysis data model result method system student research value process "
+    "theory sample study effect level function structure approach table figure "
+    "report source question section evidence argument context problem solution "
+    "history policy market energy network language memory culture design growth"
+).split()
+
+# Paraphrasing swaps words for these near-synonyms
+SYNONYMS = {
+    "analysis": "examination", "data": "evidence", "result": "outcome", "method": "technique",
+    "research": "inquiry", "study": "investigation", "effect": "impact", "approach": "strategy",
+    "problem": "issue", "solution": "answer", "growth": "expansion", "design": "layout"
+}
+
+def _sentences(rng, size):
+    sentences, length = [], 0
+    while length < size:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(6, 16))]
+        sentence = ' '.join(words).capitalize() + '.'
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return sentences
+
+def essay(size, seed=0):
+    return ' '.join(_sentences(random.Random(seed), size))
+
+def text_pair(size, kind='copy', seed=0):
+    """Two essays of about `size` characters.
+
+    copy:       text2 contains three copy-pasted spans of text1 (30% in total)
+    paraphrase: text2 is text1 with synonyms swapped in and sentences shuffled locally
+    unrelated:  independent essays
+    """
+    rng = random.Random(seed)
+    text1 = essay(size, seed)
+    if kind == 'unrelated':
+        return text1, essay(size, seed + 1)
+    if kind == 'paraphrase':
+        sentences = text1.split('. ')
+        for i in range(0, len(sentences) - 1, 4):
+            sentences[i], sentences[i + 1] = sentences[i + 1], sentences[i]
+        words = '. '.join(sentences).split(' ')
+        words = [SYNONYMS.get(w, w) if rng.random() < 0.5 else w for w in words]
+        return text1, ' '.join(words)
+    if kind == 'copy':
+        text2 = essay(size, seed + 1)
+        span = max(1, int(size * 0.1))
+        for _ in range(3):
+            start1 = rng.randrange(max(1, len(text1) - span))
+            start2 = rng.randrange(max(1, len(text2) - span))
+            text2 = text2[:start2] + text1[start1:start1 + span] + text2[start2 + span:]
+        return text1, text2
+    raise ValueError(f"Unknown text pair kind: {kind}")
+
+PYTHON_FUNCTION = '''def {name}({a}, {b}):
+    {total} = 0
+    for {item} in range({a}):
+        if {item} % {n} == 0:
+            {total} += {item} * {b}
+        else:
+            {total} -= {b}
+    while {total} > {limit}:
+        {total} //= 2
+    return [{total}, "{name}", {a} + {b}]
+
+'''
+
+JAVA_METHOD = '''    public int {name}(int {a}, int {b}) {{
+        int {total} = 0;
+        for (int {item} = 0; {item} < {a}; {item}++) {{
+            if ({item} % {n} == 0) {{
+                {total} += {item} * {b};
+            }} else {{
+                {total} -= {b};
+            }}
+        }}
+        while ({total} > {limit}) {{
+            {total} /= 2;
+        }}
+        return {total} + {a} + {b};
+    }}
+
+'''
+
+def _names(rng, prefix):
+    return {
+        key: f"{prefix}{key}_{rng.randrange(10**6)}"
+        for key in ('name', 'a', 'b', 'total', 'item')
+    }
+
+def _units(template, size, rng, renamed_rng=None):
+    """Units of code rendered twice: as written and, if renamed_rng is given, with fresh names"""
+    original, renamed = [], []
+    length = 0
+    while length < size:
+        values = {'n': rng.randint(2, 9), 'limit': rng.randint(100, 10**5)}
+        unit = template.format(**_names(rng, 'v'), **values)
+        original.append(unit)
+        renamed.append(template.format(**_names(renamed_rng, 'r'), **values) if renamed_rng else unit)
+        length += len(unit)
+    return original, renamed
+
+def _code_pair(template, size, kind, seed, wrap):
+    rng = random.Random(seed)
+    if kind == 'renamed':
+        original, copy = _units(template, size, rng, random.Random(seed + 1))
+    elif kind == 'reordered':
+        original, copy = _units(template, size, rng)
+        copy = list(copy)
+        random.Random(seed + 1).shuffle(copy)
+    elif kind == 'unrelated':
+        original, _ = _units(template, size, rng)
+        copy, _ = _units(template, size, random.Random(seed + 1))
+    else:
+        raise ValueError(f"Unknown code pair kind: {kind}")
+    return wrap(''.join(original)), wrap(''.join(copy))
+
+def python_pair(size, kind='renamed', seed=0):
+    """Two Python modules of about `size` characters: renamed, reordered or unrelated"""
+    return _code_pair(PYTHON_FUNCTION, size, kind, seed, lambda body: body)
+
+def java_pair(size, kind='renamed', seed=0):
+    """Two Java classes of about `size` characters: renamed, reordered or unrelated"""
+    return _code_pair(JAVA_METHOD, size, kind, seed, lambda body: f"public class Sample {{\n{body}}}\n")
+
+def pdf_bytes(size, seed=0):
+    """A PDF holding an essay of about `size` characters"""
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font('Arial', '', 11)
+    pdf.multi_cell(0, 6, essay(size, seed))
+    return pdf.output(dest='S').encode('latin-1')
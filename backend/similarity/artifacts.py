@@ -0,0 +1,95 @@
+import math
+from collections import Counter
+from functools import cached_property
+from sklearn.feature_extraction.text import TfidfVectorizer
+from similarity.minhash import get_signer
+from utils.caching import sized_lru_cache
+from config import Config
+
+TOKEN_PATTERN = r"(?u)\\b\\w+\\b|[A-Za-z_][A-Za-z0-9_]*|\\S"
+
+_ngram_analyzer = TfidfVectorizer(ngram_range=(1, 3), token_pattern=TOKEN_PATTERN).build_analyzer()
+
+# Smoothed IDF of a term in a two-document fit, as TfidfVectorizer computes it
+_IDF_SHARED = 1.0
+_IDF_UNIQUE = math.log(3 / 2) + 1
+
+class DocumentArtifacts:
+    """Lazily derived views of one document, each computed at most once.
+
+    normalized -> tokens -> token_set / shingles(k) -> signature(k, num_perm)
+    normalized -> term_counts -> term_norm
+    """
+    def __init__(self, text):
+        self.text = text
+        self._shingles = {}
+        self._signatures = {}
+
+    @cached_property
+    def normalized(self):
+        return self.text.lower().strip()
+
+    @cached_property
+    def tokens(self):
+        return self.normalized.split()
+
+    @cached_property
+    def token_set(self):
+        return frozenset(self.tokens)
+
+    def shingles(self, k=Config.CORPUS_SHINGLE_SIZE):
+        """Distinct k-word shingles as bytes, computed once per k"""
+        if k not in self._shingles:
+            words = self.tokens
+            if len(words) < k:
+                shingles = {' '.join(words).encode('utf8')} if words else ()
+            else:
+                shingles = (' '.join(words[i:i+k]).encode('utf8') for i in range(len(words) - k + 1))
+            self._shingles[k] = frozenset(shingles)
+        return self._shingles[k]
+
+    def signature(self, k=Config.MINHASH_SHINGLE_SIZE, num_perm=Config.MINHASH_PERMUTATIONS):
+        """MinHash signature of the k-word shingles, computed once per (k, num_perm)"""
+        if (k, num_perm) not in self._signatures:
+            self._signatures[(k, num_perm)] = get_signer(num_perm).signature(self.shingles(k))
+        return self._signatures[(k, num_perm)]
+
+    @cached_property
+    def term_counts(self):
+        """Word 1-3 gram counts, the raw material of the TF-IDF vector"""
+        return Counter(_ngram_analyzer(self.normalized))
+
+    @cached_property
+    def term_norm(self):
+        return sum(count * count for count in self.term_counts.values())
+
+def tfidf_cosine(doc1, doc2):
+    """Cosine of the two documents' TF-IDF vectors fitted on just this pair.
+
+    Equal to fitting TfidfVectorizer on [text1, text2], but built from each
+    document's cached term counts: with two documents a term's IDF depends only
+    on whether the other document contains it.
+    """
+    counts1, counts2 = doc1.term_counts, doc2.term_counts
+    if not counts1 or not counts2:
+        return 0.0
+    small, large = (counts1, counts2) if len(counts1) <= len(counts2) else (counts2, counts1)
+    dot = shared1 = shared2 = 0
+    for term, count in small.items():
+        other = large.get(term)
+        if other:
+            dot += count * other
+            shared1 += count * count
+            shared2 += other * other
+    if small is counts2:
+        shared1, shared2 = shared2, shared1
+    unique_weight = _IDF_UNIQUE ** 2
+    norm1 = unique_weight * (doc1.term_norm - shared1) + shared1
+    norm2 = unique_weight * (doc2.term_norm - shared2) + shared2
+    return dot * _IDF_SHARED ** 2 / math.sqrt(norm1 * norm2)
+
+# A document with every view computed holds about 40-60 bytes per character
+@sized_lru_cache(Config.DOCUMENT_CACHE_MAX_BYTES, bytes_per_char=64)
+def document_artifacts(text):
+    """Memoized DocumentArtifacts, so one document compared against many is tokenized once"""
+    return DocumentArtifacts(text)
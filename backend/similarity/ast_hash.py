@@ -0,0 +1,104 @@
+import ast
+from collections import Counter
+import javalang
+from config import Config
+
+class SubtreeIndex:
+    """Merkle hashes of every subtree of one syntax tree.
+
+    A node's hash combines its label (node type plus operator, never identifiers
+    or literal values) with its children's hashes, so renamed copies of a subtree
+    hash the same. Built bottom-up in one iterative pass.
+    """
+    def __init__(self, root, children_of, label_of, unit_of):
+        self.counts = Counter()
+        self.sizes = {}
+        self.units = []  # (kind, name, line, hash) of functions, methods and classes
+        hashes, sizes = {}, {}
+        stack = [(root, None)]
+        while stack:
+            node, children = stack.pop()
+            if children is None:
+                children = children_of(node)
+                stack.append((node, children))
+                stack.extend((child, None) for child in children)
+                continue
+            h = hash((label_of(node), tuple(hashes[id(child)] for child in children)))
+            size = 1 + sum(sizes[id(child)] for child in children)
+            hashes[id(node)], sizes[id(node)] = h, size
+            self.counts[h] += 1
+            self.sizes[h] = size
+            unit = unit_of(node)
+            if unit:
+                self.units.append(unit + (h,))
+
+    def similarity(self, other, min_size=Config.AST_MIN_SUBTREE_SIZE):
+        """Size-weighted overlap of the two subtree multisets"""
+        def weight(index, hashes):
+            return sum(index.counts[h] * index.sizes[h] for h in hashes if index.sizes[h] >= min_size)
+        total = weight(self, self.counts) + weight(other, other.counts)
+        if not total:
+            return 1.0
+        common = sum(
+            min(count, other.counts[h]) * self.sizes[h]
+            for h, count in self.counts.items()
+            if h in other.counts and self.sizes[h] >= min_size
+        )
+        return 2 * common / total
+
+    def shared_units(self, other):
+        """Functions, methods and classes whose whole structure appears in both trees"""
+        by_hash = {}
+        for kind, name, line, h in other.units:
+            by_hash.setdefault((kind, h), (name, line))
+        shared = []
+        for kind, name, line, h in self.units:
+            if (kind, h) in by_hash:
+                name2, line2 = by_hash[(kind, h)]
+                shared.append({'kind': kind, 'name1': name, 'line1': line, 'name2': name2, 'line2': line2})
+        return shared
+
+def _python_label(node):
+    return type(node).__name__
+
+def _python_unit(node):
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        return ('function', node.name, node.lineno)
+    if isinstance(node, ast.ClassDef):
+        return ('class', node.name, node.lineno)
+    return None
+
+def python_subtree_index(tree):
+    return SubtreeIndex(tree, lambda node: list(ast.iter_child_nodes(node)), _python_label, _python_unit)
+
+def _java_children(node):
+    children = []
+    pending = list(node.children)
+    while pending:
+        value = pending.pop()
+        if isinstance(value, javalang.ast.Node):
+            children.append(value)
+        elif isinstance(value, (list, tuple)):
+            pending.extend(value)
+    children.reverse()
+    return children
+
+def _java_label(node):
+    label = type(node).__name__
+    if isinstance(node, javalang.tree.BinaryOperation):
+        return f"{label}:{node.operator}"
+    if isinstance(node, javalang.tree.Assignment):
+        return f"{label}:{node.type}"
+    return label
+
+def _java_unit(node):
+    position = getattr(node, 'position', None)
+    line = position.line if position else None
+    if isinstance(node, (javalang.tree.MethodDeclaration, javalang.tree.ConstructorDeclaration)):
+        return ('method', node.name, line)
+    if isinstance(node, (javalang.tree.ClassDeclaration, javalang.tree.InterfaceDeclaration)):
+        return ('class', node.name, line)
+    return None
+
+def java_subtree_index(tree):
+    return SubtreeIndex(tree, _java_children, _java_label, _java_unit)
@@ -1,36 +1,19 @@
-import ast
 import javalang
-import clang.cindex
-from difflib import SequenceMatcher
-import re
-from collections import defaultdict
+from collections import Counter
+from similarity.parsed_source import parse_python, parse_java
+from similarity.tiling import GreedyStringTiler
+from similarity.cpp_source import get_index, CppParser
+from utils.instrumentation import timed, stage_timer
+from config import Config
 
 class CodeAnalyzer:
-    def __init__(self):
+    def __init__(self, cpp_workers=Config.CPP_WORKERS):
         self.cpp_parser = self._init_cpp_parser()
+        self.tiler = GreedyStringTiler()
+        self.cpp_sources = CppParser(workers=cpp_workers)
     
     def _init_cpp_parser(self):
-        try:
-            # Try to auto-locate libclang or use system default
-            try:
-                clang.cindex.Config.set_library_file('libclang.so')
-            except:
-                # Common paths for different operating systems
-                paths = [
-                    '/usr/lib/llvm-10/lib/libclang.so',  # Ubuntu
-                    '/usr/local/opt/llvm/lib/libclang.dylib',  # macOS Homebrew
-                    'C:\\Program Files\\LLVM\\bin\\libclang.dll'  # Windows
-                ]
-                for path in paths:
-                    try:
-                        clang.cindex.Config.set_library_file(path)
-                        break
-                    except:
-                        continue
-            return clang.cindex.Index.create()
-        except Exception as e:
-            print(f"Warning: C++ parser not available - {str(e)}")
-            return None
+        return get_index()
     
     def compare(self, code1, code2, language):
         if language == 'python':
@@ -57,74 +40,81 @@ class CodeAnalyzer:
                 result[k] = [float(x) if isinstance(x, (float, int)) else x for x in v]
         return result
     
+    def validate(self, code, language):
+        """Raise ValueError if code would not parse when compared"""
+        if language == 'python':
+            try:
+                parse_python(code)
+            except SyntaxError as e:
+                raise ValueError(f"Python syntax error: {str(e)}")
+        elif language == 'java':
+            try:
+                parse_java(code)
+            except (javalang.parser.JavaSyntaxError, javalang.tokenizer.LexerError) as e:
+                raise ValueError(f"Java syntax error: {str(e)}")
+    
     def _compare_python(self, code1, code2):
         try:
-            metrics = {
-                'ast_similarity': float(self._compare_ast(ast.parse(code1), ast.parse(code2))),
-                'function_similarity': float(self._compare_functions(code1, code2)),
-                'logic_similarity': float(self._compare_logic(code1, code2)),
-                'variable_similarity': float(self._compare_variables(ast.parse(code1), ast.parse(code2))),
-            }
-            return {
-                'details': metrics,
-                'score': float(self._calculate_python_score(code1, code2)),
-                'matches': self._find_code_matches(code1, code2)
-            }
+            with stage_timer('python.parse', len(code1) + len(code2)):
+                source1, source2 = parse_python(code1), parse_python(code2)
         except SyntaxError as e:
             raise ValueError(f"Python syntax error: {str(e)}")
+        metrics = {
+            'ast_similarity': float(self._compare_ast(source1.subtrees, source2.subtrees)),
+            'function_similarity': float(self._compare_functions(source1, source2)),
+            'logic_similarity': float(self._compare_logic(source1, source2)),
+            'variable_similarity': float(self._compare_variables(source1, source2)),
+        }
+        matches, metrics['token_similarity'] = self._find_code_matches(source1.tokens, source2.tokens)
+        return {
+            'details': metrics,
+            'score': float(self._calculate_python_score(metrics)),
+            'matches': matches,
+            'shared_structures': source1.subtrees.shared_units(source2.subtrees)
+        }
     
     def _compare_java(self, code1, code2):
         try:
-            metrics = self._get_java_metrics(code1, code2)
-            return {
-                'details': metrics,
-                'score': float(self._calculate_java_score(code1, code2)),
-                'matches': self._find_code_matches(code1, code2)
-            }
+            with stage_timer('java.parse', len(code1) + len(code2)):
+                source1, source2 = parse_java(code1), parse_java(code2)
         except javalang.parser.JavaSyntaxError as e:
             raise ValueError(f"Java syntax error: {str(e)}")
+        metrics = self._get_java_metrics(source1, source2)
+        matches, metrics['token_similarity'] = self._find_code_matches(source1.tokens, source2.tokens)
+        return {
+            'details': metrics,
+            'score': float(self._calculate_java_score(metrics)),
+            'matches': matches,
+            'shared_structures': source1.subtrees.shared_units(source2.subtrees)
+        }
     
     def _compare_cpp(self, code1, code2):
-        # Always return a warning for C++ analysis
+        if self.cpp_parser is None:
+            raise ValueError("libclang is not available")
+        with stage_timer('cpp.parse', len(code1) + len(code2)):
+            source1, source2 = self.cpp_sources.parse_many([code1, code2])
+        metrics = {
+            'ast_similarity': float(self._compare_cpp_ast(source1, source2)),
+            'function_similarity': float(self._compare_cpp_functions(source1, source2)),
+            'include_similarity': float(self._compare_cpp_includes(source1, source2)),
+            'logic_similarity': float(self._compare_logic(source1, source2)),
+        }
+        matches, metrics['token_similarity'] = self._find_code_matches(source1.tokens, source2.tokens)
         return {
-            'details': {},
-            'score': 0.0,
-            'matches': [],
-            'warning': 'C++ support is under development. Sorry for the inconvenience.'
+            'details': metrics,
+            'score': float(self._calculate_cpp_score(metrics)),
+            'matches': matches
         }
     
-    def _compare_ast(self, tree1, tree2):
-        """Compare Python AST structures using tree edit distance approximation"""
-        def ast_to_sequence(node):
-            if isinstance(node, ast.AST):
-                return [type(node).__name__] + [
-                    ast_to_sequence(x) 
-                    for x in ast.iter_child_nodes(node)
-                ]
-            elif isinstance(node, list):
-                return [ast_to_sequence(x) for x in node]
-            return str(node)
-        
-        seq1 = str(ast_to_sequence(tree1))
-        seq2 = str(ast_to_sequence(tree2))
-        
-        return SequenceMatcher(None, seq1, seq2).ratio()
+    @timed('code.ast')
+    def _compare_ast(self, subtrees1, subtrees2):
+        """Compare AST structures by size-weighted overlap of their subtree hashes"""
+        return subtrees1.similarity(subtrees2)
     
-    def _compare_functions(self, code1, code2):
+    def _compare_functions(self, source1, source2):
         """Compare function signatures and structures"""
-        def get_functions(code):
-            try:
-                tree = ast.parse(code)
-                return [
-                    (node.name, len(node.args.args))
-                    for node in ast.walk(tree) 
-                    if isinstance(node, ast.FunctionDef)
-                ]
-            except:
-                return []
-        
-        funcs1 = get_functions(code1)
-        funcs2 = get_functions(code2)
+        funcs1 = source1.functions
+        funcs2 = source2.functions
         
         if not funcs1 and not funcs2:
             return 1.0
@@ -135,77 +125,58 @@ class CodeAnalyzer:
         matches = sum(1 for f1 in funcs1 if f1 in funcs2)
         return matches / max(len(funcs1), len(funcs2))
     
-    def _compare_variables(self, tree1, tree2):
+    def _compare_variables(self, source1, source2):
         """Compare variable usage patterns"""
-        def get_vars(tree):
-            vars = defaultdict(int)
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
-                    vars[node.id] += 1
-            return vars
-        
-        vars1 = get_vars(tree1)
-        vars2 = get_vars(tree2)
+        vars1 = source1.variables
+        vars2 = source2.variables
         
         common = set(vars1.keys()) & set(vars2.keys())
         total = set(vars1.keys()) | set(vars2.keys())
         
         return len(common) / len(total) if total else 0
     
-    def _compare_logic(self, code1, code2):
-        """Compare normalized code logic (ignoring variable names)"""
-        def normalize(code):
-            # Remove comments
-            code = re.sub(r'#.*', '', code)
-            # Normalize strings
-            code = re.sub(r'"[^"]*"', '"STR"', code)
-            code = re.sub(r"'[^']*'", "'STR'", code)
-            # Normalize numbers
-            code = re.sub(r'\b\d+\b', '0', code)
-            # Normalize variable names
-            vars = {}
-            counter = 1
-            for match in re.finditer(r'\b[a-zA-Z_][a-zA-Z0-9_]*\b', code):
-                var = match.group()
-                if var not in vars and var not in ('True', 'False', 'None', 'if', 'else', 'for', 'while'):
-                    vars[var] = f'VAR{counter}'
-                    counter += 1
-            for var, replacement in vars.items():
-                code = re.sub(r'\b' + var + r'\b', replacement, code)
-            return code
-        
-        norm1 = normalize(code1)
-        norm2 = normalize(code2)
-        
-        return SequenceMatcher(None, norm1, norm2).ratio()
+    @timed('code.logic')
+    def _compare_logic(self, source1, source2):
+        """Compare normalized code logic (ignoring variable names) by the Dice overlap of token n-grams.
+
+        Linear in the token count; it tracks the SequenceMatcher ratio used
+        before, which was quadratic over whole submissions.
+        """
+        ngrams1 = self._logic_ngrams(source1.normalized.split())
+        ngrams2 = self._logic_ngrams(source2.normalized.split())
+        total = sum(ngrams1.values()) + sum(ngrams2.values())
+        if not total:
+            return 1.0
+        return 2 * sum((ngrams1 & ngrams2).values()) / total
     
-    def _find_code_matches(self, code1, code2, min_length=5):
-        """Find matching code segments using sequence alignment"""
-        lines1 = [line.strip() for line in code1.split('\n') if line.strip()]
-        lines2 = [line.strip() for line in code2.split('\n') if line.strip()]
-        
-        matcher = SequenceMatcher(None, lines1, lines2)
-        matches = []
-        
-        for match in matcher.get_matching_blocks():
-            if match.size >= min_length:
-                matches.append({
-                    'text1_start': match.a,
-                    'text1_end': match.a + match.size,
-                    'text2_start': match.b,
-                    'text2_end': match.b + match.size,
-                    'similarity': 1.0  # Exact match in this simple implementation
-                })
-        
-        return matches
+    def _logic_ngrams(self, tokens, n=Config.LOGIC_NGRAM_SIZE):
+        if len(tokens) < n:
+            return Counter([tuple(tokens)] if tokens else [])
+        return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
     
-    def _compare_java_classes(self, tree1, tree2):
+    @timed('code.tiling')
+    def _find_code_matches(self, tokens1, tokens2):
+        """Tile normalized token streams with Greedy String Tiling.
+
+        Returns the tiles as character-offset matches plus the share of tokens they cover.
+        """
+        tiles = self.tiler.tile([t.value for t in tokens1], [t.value for t in tokens2])
+        matches = [
+            {
+                'text1_start': tokens1[i].start,
+                'text1_end': tokens1[i + length - 1].end,
+                'text2_start': tokens2[j].start,
+                'text2_end': tokens2[j + length - 1].end,
+                'similarity': 1.0  # Tiles are exact matches of the normalized tokens
+            }
+            for i, j, length in tiles
+        ]
+        return matches, self.tiler.coverage(tiles, len(tokens1), len(tokens2))
+    
+    def _compare_java_classes(self, source1, source2):
         """Compare Java class structures"""
-        def get_classes(tree):
-            return [path.name for path in tree.types if isinstance(path, javalang.tree.ClassDeclaration)]
-        
-        classes1 = get_classes(tree1)
-        classes2 = get_classes(tree2)
+        classes1 = source1.classes
+        classes2 = source2.classes
         
         if not classes1 and not classes2:
             return 1.0
@@ -215,19 +186,10 @@ class CodeAnalyzer:
         common = set(classes1) & set(classes2)
         return len(common) / max(len(classes1), len(classes2))
     
-    def _compare_java_methods(self, tree1, tree2):
+    def _compare_java_methods(self, source1, source2):
         """Compare Java method signatures"""
-        def get_methods(tree):
-            methods = []
-            for path in tree.types:
-                if isinstance(path, javalang.tree.ClassDeclaration):
-                    for member in path.body:
-                        if isinstance(member, javalang.tree.MethodDeclaration):
-                            methods.append((member.name, len(member.parameters)))
-            return methods
-        
-        methods1 = get_methods(tree1)
-        methods2 = get_methods(tree2)
+        methods1 = source1.methods
+        methods2 = source2.methods
         
         if not methods1 and not methods2:
             return 1.0
@@ -237,10 +199,25 @@ class CodeAnalyzer:
         common = set(methods1) & set(methods2)
         return len(common) / max(len(methods1), len(methods2))
     
-    def _compare_java_imports(self, tree1, tree2):
+    def _compare_java_method_bodies(self, source1, source2):
+        """Compare method bodies by statement-structure fingerprint (catches renamed copies)"""
+        bodies1 = source1.method_bodies
+        bodies2 = source2.method_bodies
+        
+        if not bodies1 and not bodies2:
+            return 1.0
+        if not bodies1 or not bodies2:
+            return 0.0
+            
+        count1 = sum(len(names) for names in bodies1.values())
+        count2 = sum(len(names) for names in bodies2.values())
+        common = sum(min(len(names), len(bodies2[fp])) for fp, names in bodies1.items() if fp in bodies2)
+        return common / max(count1, count2)
+    
+    def _compare_java_imports(self, source1, source2):
         """Compare Java import statements"""
-        imports1 = {imp.path for imp in tree1.imports}
-        imports2 = {imp.path for imp in tree2.imports}
+        imports1 = source1.imports
+        imports2 = source2.imports
         
         if not imports1 and not imports2:
             return 1.0
@@ -250,39 +227,29 @@ class CodeAnalyzer:
         common = imports1 & imports2
         return len(common) / max(len(imports1), len(imports2))
     
-    def _compare_cpp_ast(self, tu1, tu2):
-        """Compare C++ AST structures"""
-        def traverse(node, depth=0):
-            if not node:
-                return []
-            result = [node.kind.name]
-            for child in node.get_children():
-                result.extend(traverse(child, depth+1))
-            return result
-        
-        ast1 = traverse(tu1.cursor)
-        ast2 = traverse(tu2.cursor)
-        
-        return SequenceMatcher(None, str(ast1), str(ast2)).ratio()
+    def _compare_cpp_ast(self, source1, source2):
+        """Compare C++ AST structures by tiling their cursor kind sequences"""
+        tiles = self.tiler.tile(source1.kinds, source2.kinds)
+        return self.tiler.coverage(tiles, len(source1.kinds), len(source2.kinds))
     
-    def _compare_cpp_functions(self, code1, code2):
+    def _compare_cpp_functions(self, source1, source2):
         """Compare C++ function signatures"""
-        func_pattern = r'\b\w+\s+\w+\s*\([^)]*\)\s*(?:const)?\s*{'
-        funcs1 = re.findall(func_pattern, code1)
-        funcs2 = re.findall(func_pattern, code2)
+        funcs1 = source1.functions
+        funcs2 = source2.functions
         
         if not funcs1 and not funcs2:
             return 1.0
         if not funcs1 or not funcs2:
             return 0.0
             
-        # Simple comparison of function counts
-        return min(len(funcs1), len(funcs2)) / max(len(funcs1), len(funcs2))
+        # Count matching (name, arity) signatures
+        matches = sum(1 for f1 in funcs1 if f1 in funcs2)
+        return matches / max(len(funcs1), len(funcs2))
     
-    def _compare_cpp_includes(self, code1, code2):
+    def _compare_cpp_includes(self, source1, source2):
         """Compare C++ include directives"""
-        includes1 = set(re.findall(r'#include\s+[<"][^>"]+[>"]', code1))
-        includes2 = set(re.findall(r'#include\s+[<"][^>"]+[>"]', code2))
+        includes1 = source1.includes
+        includes2 = source2.includes
         
         if not includes1 and not includes2:
             return 1.0
@@ -292,42 +259,47 @@ class CodeAnalyzer:
         common = includes1 & includes2
         return len(common) / max(len(includes1), len(includes2))
     
-    def _calculate_python_score(self, code1, code2):
+    def _calculate_python_score(self, metrics):
         """Weighted average of Python analysis metrics"""
-        metrics = self._compare_python(code1, code2)
         weights = {
-            'ast_similarity': 0.4,
-            'function_similarity': 0.3,
-            'logic_similarity': 0.2,
-            'variable_similarity': 0.1
+            'token_similarity': 0.3,
+            'ast_similarity': 0.3,
+            'function_similarity': 0.2,
+            'logic_similarity': 0.15,
+            'variable_similarity': 0.05
         }
         return sum(metrics[k] * weights[k] for k in weights)
     
-    def _calculate_java_score(self, code1, code2):
+    def _calculate_java_score(self, metrics):
         """Weighted average of Java analysis metrics"""
-        metrics = self._get_java_metrics(code1, code2)
         weights = {
-            'class_similarity': 0.3,
-            'method_similarity': 0.5,
-            'import_similarity': 0.2
+            'token_similarity': 0.3,
+            'ast_similarity': 0.2,
+            'method_body_similarity': 0.15,
+            'logic_similarity': 0.1,
+            'class_similarity': 0.05,
+            'method_similarity': 0.15,
+            'import_similarity': 0.05
         }
         return sum(metrics[k] * weights[k] for k in weights)
 
-    def _get_java_metrics(self, code1, code2):
-        tree1 = javalang.parse.parse(code1)
-        tree2 = javalang.parse.parse(code2)
+    def _get_java_metrics(self, source1, source2):
         return {
-            'class_similarity': float(self._compare_java_classes(tree1, tree2)),
-            'method_similarity': float(self._compare_java_methods(tree1, tree2)),
-            'import_similarity': float(self._compare_java_imports(tree1, tree2)),
+            'ast_similarity': float(self._compare_ast(source1.subtrees, source2.subtrees)),
+            'class_similarity': float(self._compare_java_classes(source1, source2)),
+            'method_similarity': float(self._compare_java_methods(source1, source2)),
+            'method_body_similarity': float(self._compare_java_method_bodies(source1, source2)),
+            'import_similarity': float(self._compare_java_imports(source1, source2)),
+            'logic_similarity': float(self._compare_logic(source1, source2)),
         }
     
-    def _calculate_cpp_score(self, code1, code2):
+    def _calculate_cpp_score(self, metrics):
         """Weighted average of C++ analysis metrics"""
-        metrics = self._compare_cpp(code1, code2)
         weights = {
-            'ast_similarity': 0.4,
-            'function_similarity': 0.4,
-            'include_similarity': 0.2
+            'token_similarity': 0.3,
+            'ast_similarity': 0.25,
+            'logic_similarity': 0.1,
+            'function_similarity': 0.2,
+            'include_similarity': 0.15
         }
         return sum(metrics[k] * weights[k] for k in weights)
\ No newline at end of file
@@ -0,0 +1,176 @@
+import io
+import keyword
+import re
+import tokenize
+from collections import namedtuple
+import javalang
+from config import Config
+from utils.caching import sized_lru_cache
+
+# value is the normalized token; start/end are character offsets into the source
+Token = namedtuple('Token', ['value', 'start', 'end'])
+
+# kind is one of keyword, identifier, string, number, op, indent, dedent
+RawToken = namedtuple('RawToken', ['kind', 'text', 'start', 'end'])
+
+_PYTHON_SKIP = {
+    tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE,
+    tokenize.ENCODING, tokenize.ENDMARKER,
+    getattr(tokenize, 'FSTRING_MIDDLE', None), getattr(tokenize, 'FSTRING_END', None)
+}
+_PYTHON_STRINGS = {tokenize.STRING, getattr(tokenize, 'FSTRING_START', None)}
+
+CPP_KEYWORDS = frozenset('''
+    alignas alignof asm auto bool break case catch char char8_t char16_t char32_t class
+    concept const consteval constexpr constinit const_cast continue co_await co_return
+    co_yield decltype default delete do double dynamic_cast else enum explicit export
+    extern false float for friend goto if inline int long mutable namespace new noexcept
+    nullptr operator private protected public register reinterpret_cast requires restrict
+    return short signed sizeof static static_assert static_cast struct switch template
+    this thread_local throw true try typedef typeid typename union unsigned using virtual
+    void volatile wchar_t while
+    include define undef ifdef ifndef elif endif pragma
+'''.split())
+
+_CPP_TOKEN = re.compile(
+    r'(?P<comment>//[^\n]*|/\*.*?\*/)'
+    r'|(?P<string>(?:u8|[uUL])?R"(?P<delim>[^(\s]*)\(.*?\)(?P=delim)"'
+    r'|(?:u8|[uUL])?"(?:\\.|[^"\\\n])*"|(?:u8|[uUL])?\'(?:\\.|[^\'\\\n])*\')'
+    r'|(?P<number>\.?\d(?:[eEpP][+-]|[\w.\'])*)'
+    r'|(?P<identifier>[^\W\d]\w*)'
+    r'|(?P<op>::|->\*?|\+\+|--|<<=?|>>=?|<=>|[<>=!+\-*/%&|^]=|&&|\|\||\.\.\.|##|[^\s\w])',
+    re.S
+)
+
+def _line_offsets(code):
+    # Lines end at "\n" only, as io.StringIO.readline splits them; str.splitlines
+    # would also break on form feeds and other separators the lexers do not count
+    offsets = [0] + [match.end() for match in re.finditer('\n', code)]
+    if offsets[-1] != len(code):
+        offsets.append(len(code))
+    return offsets
+
+# javalang decodes these (a backslash, one or more u's, four hex digits) before tokenizing
+_JAVA_UNICODE_ESCAPE = re.compile(r'\\u+[0-9a-fA-F]{4}')
+
+def _java_decode(code):
+    """The text javalang tokenizes, and the offset in code of each of its characters plus the end"""
+    decoded, offsets, last = [], [], 0
+    for match in _JAVA_UNICODE_ESCAPE.finditer(code):
+        decoded.append(code[last:match.start()])
+        decoded.append(chr(int(match.group()[-4:], 16)))
+        offsets.extend(range(last, match.start() + 1))
+        last = match.end()
+    decoded.append(code[last:])
+    offsets.extend(range(last, len(code) + 1))
+    return ''.join(decoded), offsets
+
+def _lex_python(code):
+    offsets = _line_offsets(code)
+    tokens = []
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+            if tok.type in _PYTHON_SKIP:
+                continue
+            if tok.type == tokenize.NAME:
+                kind = 'keyword' if keyword.iskeyword(tok.string) else 'identifier'
+            elif tok.type == tokenize.NUMBER:
+                kind = 'number'
+            elif tok.type in _PYTHON_STRINGS:
+                kind = 'string'
+            elif tok.type == tokenize.INDENT:
+                kind = 'indent'
+            elif tok.type == tokenize.DEDENT:
+                kind = 'dedent'
+            else:
+                kind = 'op'
+            start = offsets[tok.start[0] - 1] + tok.start[1]
+            end = offsets[tok.end[0] - 1] + tok.end[1]
+            tokens.append(RawToken(kind, tok.string, start, end))
+    except (tokenize.TokenError, IndentationError):
+        pass  # keep whatever was tokenized before the error
+    return tokens
+
+def _lex_java(code):
+    # Token positions index the decoded text; map them back when escapes changed its length
+    decoded, source_offsets = _java_decode(code) if '\\u' in code else (code, None)
+    offsets = _line_offsets(decoded) + [len(decoded)]
+    tokens = []
+    try:
+        for tok in javalang.tokenizer.tokenize(code):
+            if isinstance(tok, javalang.tokenizer.Identifier):
+                kind = 'identifier'
+            elif isinstance(tok, (javalang.tokenizer.String, javalang.tokenizer.Character)):
+                kind = 'string'
+            elif isinstance(tok, (javalang.tokenizer.Integer, javalang.tokenizer.FloatingPoint)):
+                kind = 'number'
+            elif isinstance(tok, (javalang.tokenizer.Keyword, javalang.tokenizer.Boolean, javalang.tokenizer.Null)):
+                kind = 'keyword'
+            else:
+                kind = 'op'
+            start = offsets[tok.position.line - 1] + tok.position.column - 1
+            end = start + len(tok.value)
+            if source_offsets is not None:
+                start, end = source_offsets[start], source_offsets[end]
+            tokens.append(RawToken(kind, tok.value, start, end))
+    except javalang.tokenizer.LexerError:
+        pass
+    return tokens
+
+def _lex_cpp(code):
+    tokens = []
+    for match in _CPP_TOKEN.finditer(code):
+        kind = match.lastgroup
+        if kind == 'comment':
+            continue
+        text = match.group()
+        if kind == 'identifier' and text in CPP_KEYWORDS:
+            kind = 'keyword'
+        tokens.append(RawToken(kind, text, match.start(), match.end()))
+    return tokens
+
+_LEXERS = {'python': _lex_python, 'java': _lex_java, 'cpp': _lex_cpp}
+
+# About 30 bytes of tokens per character of source
+@sized_lru_cache(Config.PARSE_CACHE_MAX_BYTES, bytes_per_char=32)
+def lex(code, language):
+    """One lexical pass over a document, shared by every normalized view of it"""
+    if language not in _LEXERS:
+        raise ValueError(f"Unsupported language: {language}")
+    return tuple(_LEXERS[language](code))
+
+_TOKEN_VALUES = {'identifier': 'ID', 'string': 'STR', 'number': 'NUM', 'indent': 'INDENT', 'dedent': 'DEDENT'}
+
+def code_tokens(code, language):
+    """Tokens with identifiers and literals collapsed, for tiling"""
+    return [Token(_TOKEN_VALUES.get(tok.kind, tok.text), tok.start, tok.end) for tok in lex(code, language)]
+
+def code_shingles(code, language, k=Config.CODE_SCREEN_KGRAM_SIZE):
+    """Distinct k-grams of the tiling tokens as bytes, for MinHash screening of code"""
+    values = [tok.value for tok in code_tokens(code, language)]
+    if len(values) < k:
+        return frozenset({' '.join(values).encode('utf8')} if values else ())
+    return frozenset(' '.join(values[i:i + k]).encode('utf8') for i in range(len(values) - k + 1))
+
+@sized_lru_cache(Config.PARSE_CACHE_MAX_BYTES, bytes_per_char=2)
+def normalize_code(code, language):
+    """Normalize code logic in one token pass.
+
+    Comments are dropped, literals collapse to "STR" and 0, and each distinct
+    identifier becomes VAR1, VAR2, ... in order of first use. Keywords and
+    operators are kept.
+    """
+    names = {}
+    parts = []
+    for tok in lex(code, language):
+        if tok.kind == 'identifier':
+            parts.append(names.setdefault(tok.text, f'VAR{len(names) + 1}'))
+        elif tok.kind == 'string':
+            parts.append('"STR"')
+        elif tok.kind == 'number':
+            parts.append('0')
+        elif tok.kind in ('indent', 'dedent'):
+            parts.append(tok.kind.upper())
+        else:
+            parts.append(tok.text)
+    return ' '.join(parts)
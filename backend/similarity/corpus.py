@@ -0,0 +1,155 @@
+import os
+import pickle
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+from similarity.artifacts import document_artifacts
+from similarity.code_tokens import code_shingles
+from similarity.minhash import estimate_jaccard, get_signer
+from utils.pipeline import CODE_TYPES
+from config import Config
+
+def lsh_bands(threshold, num_perm):
+    """Bands and rows per band whose collision curve crosses 50% closest to threshold"""
+    return min(
+        ((bands, num_perm // bands) for bands in range(1, num_perm + 1)),
+        key=lambda p: abs((1 / p[0]) ** (1 / p[1]) - threshold)
+    )
+
+class CorpusIndex:
+    """MinHash LSH index over every previously ingested submission.
+
+    Documents, their uint32 signatures and the LSH band keys live in SQLite,
+    so every web worker reads and writes the same index and an add touches
+    only its own rows. Text is signed from word shingles and code from
+    k-grams of its normalized tokens, so renamed copies still collide.
+    """
+    def __init__(self, path=Config.CORPUS_DB, threshold=Config.CORPUS_LSH_THRESHOLD,
+                 num_perm=Config.MINHASH_PERMUTATIONS, shingle_size=Config.CORPUS_SHINGLE_SIZE,
+                 code_shingle_size=Config.CODE_SCREEN_KGRAM_SIZE, legacy_path=Config.CORPUS_PATH):
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.code_shingle_size = code_shingle_size
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS documents ('
+                'id TEXT PRIMARY KEY, name TEXT, file_type TEXT, content TEXT, signature BLOB, added TEXT)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS bands ('
+                'band INTEGER, key BLOB, doc_id TEXT, PRIMARY KEY (band, key, doc_id)) WITHOUT ROWID'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS bands_doc ON bands (doc_id)')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+        self._check_parameters()
+        self._import_legacy(legacy_path)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+
+    def add(self, content, name, file_type, doc_id=None):
+        """Ingest a document and return its id"""
+        doc_id = doc_id or uuid.uuid4().hex
+        signature = self._signature(content, file_type)
+        with self._connect() as conn:
+            self._write(conn, doc_id, name, file_type, content, signature, datetime.now().isoformat())
+        return doc_id
+
+    def query(self, content, file_type, top_k=Config.CORPUS_TOP_K):
+        """Return the top_k indexed documents most likely to overlap with content"""
+        signature = self._signature(content, file_type)
+        with self._connect() as conn:
+            matched = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                matched.update(row[0] for row in conn.execute(
+                    'SELECT doc_id FROM bands WHERE band = ? AND key = ?', (band, key)))
+            candidates = []
+            ids = list(matched)
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                candidates.extend(conn.execute(
+                    f"SELECT id, name, signature FROM documents WHERE file_type = ? "
+                    f"AND id IN ({', '.join('?' * len(chunk))})", (file_type, *chunk)))
+            # Ranked from the stored signatures alone; only the top_k texts are read
+            ranked = sorted(
+                ((estimate_jaccard(signature, np.frombuffer(blob, dtype=np.uint32)), doc_id, name)
+                 for doc_id, name, blob in candidates),
+                key=lambda item: item[0],
+                reverse=True
+            )[:top_k]
+            return [
+                {
+                    'document_id': doc_id,
+                    'name': name,
+                    'content': conn.execute('SELECT content FROM documents WHERE id = ?', (doc_id,)).fetchone()[0],
+                    'estimated_similarity': float(estimate)
+                }
+                for estimate, doc_id, name in ranked
+            ]
+
+    def _signature(self, content, file_type):
+        if file_type in CODE_TYPES:
+            return get_signer(self.num_perm).signature(code_shingles(content, file_type, self.code_shingle_size))
+        return document_artifacts(content).signature(self.shingle_size, self.num_perm)
+
+    def _band_keys(self, signature):
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def _write(self, conn, doc_id, name, file_type, content, signature, added):
+        conn.execute('DELETE FROM bands WHERE doc_id = ?', (doc_id,))
+        conn.execute(
+            'INSERT OR REPLACE INTO documents (id, name, file_type, content, signature, added) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (doc_id, name, file_type, content, signature.astype(np.uint32).tobytes(), added)
+        )
+        conn.executemany(
+            'INSERT OR IGNORE INTO bands (band, key, doc_id) VALUES (?, ?, ?)',
+            [(band, key, doc_id) for band, key in enumerate(self._band_keys(signature))]
+        )
+
+    def _check_parameters(self):
+        """Re-sign and re-band every document if the index was built with other LSH settings"""
+        parameters = f"{self.num_perm}:{self.bands}:{self.shingle_size}:code{self.code_shingle_size}"
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute("SELECT value FROM meta WHERE name = 'lsh'").fetchone()
+            if row and row[0] != parameters:
+                for doc in conn.execute('SELECT id, name, file_type, content, added FROM documents').fetchall():
+                    doc_id, name, file_type, content, added = doc
+                    self._write(conn, doc_id, name, file_type, content, self._signature(content, file_type), added)
+            conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('lsh', ?)", (parameters,))
+
+    def _import_legacy(self, legacy_path):
+        """One-time import of an index pickled by earlier versions; the pickle is renamed afterwards"""
+        if not legacy_path:
+            return
+        try:
+            with open(legacy_path, 'rb') as f:
+                documents = pickle.load(f)['documents']
+        except FileNotFoundError:
+            return
+        with self._connect() as conn:
+            for doc_id, doc in documents.items():
+                self._write(conn, doc_id, doc['name'], doc['file_type'], doc['content'],
+                            self._signature(doc['content'], doc['file_type']), doc.get('added', datetime.now().isoformat()))
+        try:
+            os.replace(legacy_path, legacy_path + '.imported')
+        except OSError:
+            pass
@@ -0,0 +1,113 @@
+import hashlib
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import clang.cindex
+from config import Config
+from similarity.code_tokens import code_tokens, normalize_code
+from utils.caching import SizedCache
+
+MAIN_FILE = 'input.cpp'
+
+_FUNCTION_KINDS = {
+    clang.cindex.CursorKind.FUNCTION_DECL,
+    clang.cindex.CursorKind.CXX_METHOD,
+    clang.cindex.CursorKind.CONSTRUCTOR,
+    clang.cindex.CursorKind.DESTRUCTOR,
+    clang.cindex.CursorKind.FUNCTION_TEMPLATE
+}
+
+_index = None
+
+def get_index():
+    """The per-process libclang Index, or None when libclang cannot be loaded"""
+    global _index
+    if _index is None:
+        _index = _create_index()
+    return _index
+
+def _create_index():
+    try:
+        # Try an explicitly configured library, then auto-locate libclang or use system default
+        paths = [Config.LIBCLANG_PATH] if Config.LIBCLANG_PATH else []
+        paths += [
+            'libclang.so',
+            '/usr/lib/llvm-10/lib/libclang.so',  # Ubuntu
+            '/usr/local/opt/llvm/lib/libclang.dylib',  # macOS Homebrew
+            'C:\\Program Files\\LLVM\\bin\\libclang.dll'  # Windows
+        ]
+        for path in paths:
+            try:
+                clang.cindex.Config.set_library_file(path)
+                return clang.cindex.Index.create()
+            except Exception:
+                continue
+        return clang.cindex.Index.create()
+    except Exception as e:
+        print(f"Warning: C++ parser not available - {str(e)}")
+        return None
+
+class CppSource:
+    """Picklable summary of one C/C++ translation unit: cursor kinds, functions, includes, tokens, normalized logic"""
+    def __init__(self, tu, code):
+        self.kinds = []
+        self.functions = []
+        self.includes = set(re.findall(r'#include\s+[<"][^>"]+[>"]', code))
+
+        # Iterative pre-order walk of the declarations that come from the submission itself
+        stack = [c for c in tu.cursor.get_children() if c.location.file and c.location.file.name == MAIN_FILE]
+        stack.reverse()
+        while stack:
+            cursor = stack.pop()
+            self.kinds.append(cursor.kind.value)
+            if cursor.kind in _FUNCTION_KINDS and cursor.is_definition():
+                self.functions.append((cursor.spelling, len(list(cursor.get_arguments()))))
+            children = list(cursor.get_children())
+            children.reverse()
+            stack.extend(children)
+
+        self.normalized = normalize_code(code, 'cpp')
+        self.tokens = code_tokens(code, 'cpp')
+
+def parse_cpp(code):
+    """Parse one source from an unsaved buffer; runs in pool workers or in-process"""
+    index = get_index()
+    if index is None:
+        raise ValueError("libclang is not available")
+    tu = index.parse(MAIN_FILE, args=Config.CPP_PARSE_ARGS, unsaved_files=[(MAIN_FILE, code)])
+    return CppSource(tu, code)
+
+class CppParser:
+    """Parses C/C++ sources on a process pool, caching results by content hash"""
+    # Charged like the other parsed sources; the translation unit itself lives in libclang's heap
+    BYTES_PER_CHAR = 96
+
+    def __init__(self, cache_bytes=Config.PARSE_CACHE_MAX_BYTES, workers=Config.CPP_WORKERS):
+        self.workers = workers
+        self._cache = SizedCache(cache_bytes)
+        self._pool = None
+        self._pool_pid = None
+
+    def parse_many(self, codes):
+        keys = [hashlib.sha256(code.encode('utf-8')).hexdigest() for code in codes]
+        parsed = {key: self._cache.get(key) for key in keys}
+        parsed = {key: source for key, source in parsed.items() if source is not None}
+        missing = {key: code for key, code in zip(keys, codes) if key not in parsed}
+
+        if len(missing) > 1 and self.workers > 1:
+            results = self._executor().map(parse_cpp, missing.values())
+        else:
+            results = map(parse_cpp, missing.values())
+        parsed.update(zip(missing, results))
+
+        for key, code in zip(keys, codes):
+            self._cache.put(key, parsed[key], self.BYTES_PER_CHAR * len(code))
+        return [parsed[key] for key in keys]
+
+    def _executor(self):
+        if self._pool is None or self._pool_pid != os.getpid():
+            context = multiprocessing.get_context('spawn')
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            self._pool_pid = os.getpid()
+        return self._pool
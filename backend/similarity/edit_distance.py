@@ -0,0 +1,87 @@
+from collections import Counter
+from Levenshtein import distance as levenshtein_distance
+from utils.instrumentation import timed
+from config import Config
+
+class BoundedLevenshtein:
+    """Levenshtein similarity whose cost is bounded by document size.
+
+    Every result carries the mode that produced it and an error bound:
+    'similarity' is a guaranteed lower bound on the exact value, which lies
+    within [similarity, similarity + error_bound].
+
+    - exact:   full edit distance (error bound 0)
+    - banded:  edit distance under a cutoff, so only a diagonal band is computed;
+               exact when the distance is within the cutoff (error bound 0)
+    - bounded: the similarity provably falls below min_similarity, so it is
+               not computed further; only the bounds are reported
+    - chunked: documents longer than exact_max_length are aligned chunk by chunk;
+               the summed chunk distances are a valid edit script, so they bound
+               the distance from above
+    """
+    def __init__(self, min_similarity=Config.LEVENSHTEIN_MIN_SIMILARITY,
+                 exact_max_length=Config.LEVENSHTEIN_EXACT_MAX_LENGTH,
+                 chunk_size=Config.LEVENSHTEIN_CHUNK_SIZE):
+        self.min_similarity = min_similarity
+        self.exact_max_length = exact_max_length
+        self.chunk_size = chunk_size
+
+    @timed('text.levenshtein')
+    def compare(self, text1, text2):
+        max_len = max(len(text1), len(text2))
+        if not max_len:
+            return self._result('exact', 0.0, 0.0, None)
+
+        # Character-histogram difference: no edit script can be shorter
+        lower = self._histogram_bound(text1, text2)
+        upper_similarity = 1 - lower / max_len
+        if upper_similarity < self.min_similarity:
+            return self._result('bounded', 0.0, upper_similarity, None)
+
+        if max_len > self.exact_max_length:
+            distance = self._chunked_distance(text1, text2)
+            return self._result('chunked', 1 - distance / max_len, upper_similarity, distance)
+
+        cutoff = int((1 - self.min_similarity) * max_len)
+        if cutoff >= max_len:
+            distance = levenshtein_distance(text1, text2)
+            return self._result('exact', 1 - distance / max_len, None, distance)
+
+        distance = levenshtein_distance(text1, text2, score_cutoff=cutoff)
+        if distance > cutoff:
+            return self._result('bounded', 0.0, min(upper_similarity, 1 - (cutoff + 1) / max_len), None)
+        return self._result('banded', 1 - distance / max_len, None, distance)
+
+    def _result(self, mode, similarity, upper, distance):
+        return {
+            'mode': mode,
+            'similarity': similarity,
+            'error_bound': 0.0 if upper is None else max(0.0, upper - similarity),
+            'distance': distance
+        }
+
+    def _histogram_bound(self, text1, text2):
+        counts1, counts2 = Counter(text1), Counter(text2)
+        counts1.subtract(counts2)
+        surplus = sum(c for c in counts1.values() if c > 0)
+        deficit = -sum(c for c in counts1.values() if c < 0)
+        return max(surplus, deficit)
+
+    def _chunked_distance(self, text1, text2, anchor=32):
+        """Sum of edit distances between aligned chunks.
+
+        Each chunk boundary in text2 is placed just after the first nearby copy of the
+        `anchor` characters preceding the boundary in text1, falling back to the
+        proportional position when there is none.
+        """
+        ratio = len(text2) / len(text1)
+        reach = self.chunk_size // 2
+        total, start1, start2 = 0, 0, 0
+        for end1 in range(self.chunk_size, len(text1), self.chunk_size):
+            expected = start2 + int((end1 - start1) * ratio)
+            lo = max(start2, expected - reach)
+            found = text2.find(text1[end1 - anchor:end1], lo, expected + reach)
+            end2 = found + anchor if found >= 0 else min(expected, len(text2))
+            total += levenshtein_distance(text1[start1:end1], text2[start2:end2])
+            start1, start2 = end1, end2
+        return total + levenshtein_distance(text1[start1:], text2[start2:])
@@ -0,0 +1,91 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from utils.instrumentation import INFERENCE_SECONDS, INFERENCE_BATCH_SIZE
+from config import Config
+
+class BatchScheduler:
+    """Collects cross-encoder scoring requests and runs them in micro-batches"""
+    def __init__(self, model, max_batch_size=Config.SEMANTIC_MAX_BATCH_SIZE,
+                 max_wait=Config.SEMANTIC_MAX_WAIT):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._pairs = 0
+        self._batches = 0
+        self._busy_time = 0.0
+
+    def submit(self, text1, text2):
+        """Queue one pair and return a Future resolving to its score"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put(((text1, text2), future))
+        return future
+
+    def score(self, text1, text2):
+        return self.submit(text1, text2).result()
+
+    def predict(self, pairs):
+        """Score many pairs at once, e.g. from a batch job"""
+        futures = [self.submit(text1, text2) for text1, text2 in pairs]
+        return [future.result() for future in futures]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pairs': self._pairs,
+                'batches': self._batches,
+                'mean_batch_size': self._pairs / self._batches if self._batches else 0.0,
+                'busy_seconds': self._busy_time,
+                'pairs_per_second': self._pairs / self._busy_time if self._busy_time else 0.0
+            }
+
+    def _ensure_worker(self):
+        # A forked worker inherits the object but not the thread, so restart per process
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='semantic-batcher', daemon=True)
+            self._thread.start()
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            pairs = [pair for pair, _ in batch]
+            start = time.perf_counter()
+            try:
+                scores = self.model.predict(pairs, batch_size=len(pairs))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - start
+            INFERENCE_SECONDS.observe(elapsed)
+            INFERENCE_BATCH_SIZE.observe(len(pairs))
+            with self._lock:
+                self._pairs += len(pairs)
+                self._batches += 1
+                self._busy_time += elapsed
+            for (_, future), score in zip(batch, scores):
+                future.set_result(float(score))
@@ -0,0 +1,136 @@
+import re
+from collections import deque, defaultdict
+from config import Config
+
+class MatchFinder:
+    """Seed-and-extend matcher built on winnowed k-gram fingerprints"""
+    def __init__(self, k=Config.MATCH_KGRAM_SIZE, window=Config.MATCH_WINNOW_WINDOW,
+                 min_length=Config.MIN_MATCH_LENGTH, max_gap=Config.MATCH_MAX_GAP,
+                 max_occurrences=16):
+        self.k = k
+        self.window = window
+        self.min_length = min_length
+        self.max_gap = max_gap
+        self.max_occurrences = max_occurrences
+
+    def find(self, text1, text2, threshold=0.7):
+        norm1, offsets1 = self._normalize(text1)
+        norm2, offsets2 = self._normalize(text2)
+        if len(norm1) < self.k or len(norm2) < self.k:
+            return []
+
+        seeds = self._find_seeds(norm1, norm2)
+        spans = self._extend_seeds(norm1, norm2, seeds)
+
+        matches = []
+        for start1, end1, start2, end2, matched in self._merge_spans(spans):
+            length = max(end1 - start1, end2 - start2)
+            similarity = matched / length
+            if length < self.min_length or similarity < threshold:
+                continue
+            matches.append({
+                'text1_start': offsets1[start1],
+                'text1_end': offsets1[end1 - 1] + 1,
+                'text2_start': offsets2[start2],
+                'text2_end': offsets2[end2 - 1] + 1,
+                'similarity': similarity
+            })
+        return matches
+
+    def _normalize(self, text):
+        """Lowercase and collapse whitespace, keeping a map back to raw offsets"""
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Some characters expand when lowercased; keep offsets exact
+            lowered = text
+        parts, offsets = [], []
+        for run in re.finditer(r'\S+', lowered):
+            if parts:
+                parts.append(' ')
+                offsets.append(run.start() - 1)
+            parts.append(run.group())
+            offsets.extend(range(run.start(), run.end()))
+        return ''.join(parts), offsets
+
+    def _winnow(self, text):
+        """Select the rightmost minimal k-gram hash of every window"""
+        k = self.k
+        hashes = [hash(text[i:i+k]) for i in range(len(text) - k + 1)]
+        window = min(self.window, len(hashes))
+        fingerprints = defaultdict(list)
+        candidates = deque()
+        last = -1
+        for i, h in enumerate(hashes):
+            while candidates and hashes[candidates[-1]] >= h:
+                candidates.pop()
+            candidates.append(i)
+            if candidates[0] <= i - window:
+                candidates.popleft()
+            if i >= window - 1 and candidates[0] != last:
+                last = candidates[0]
+                fingerprints[hashes[last]].append(last)
+        return fingerprints
+
+    def _find_seeds(self, text1, text2):
+        """Pair up positions of fingerprints shared by both texts"""
+        fingerprints1 = self._winnow(text1)
+        fingerprints2 = self._winnow(text2)
+        seeds = []
+        for h in fingerprints1.keys() & fingerprints2.keys():
+            positions1, positions2 = fingerprints1[h], fingerprints2[h]
+            # Skip boilerplate that repeats all over both documents
+            if len(positions1) > self.max_occurrences or len(positions2) > self.max_occurrences:
+                continue
+            seeds.extend((i, j) for i in positions1 for j in positions2)
+        seeds.sort(key=lambda seed: (seed[0] - seed[1], seed[0]))
+        return seeds
+
+    def _extend_seeds(self, text1, text2, seeds):
+        """Grow every verified seed into a maximal exact span on its diagonal"""
+        k = self.k
+        spans = []
+        covered = {}
+        for i, j in seeds:
+            diagonal = i - j
+            if i < covered.get(diagonal, -1):
+                continue
+            if text1[i:i+k] != text2[j:j+k]:
+                continue  # hash collision
+            start1, start2 = i, j
+            while start1 > 0 and start2 > 0 and text1[start1-1] == text2[start2-1]:
+                start1 -= 1
+                start2 -= 1
+            length = k + self._common_prefix(text1, text2, i + k, j + k)
+            covered[diagonal] = i + length
+            spans.append((start1, i + length, start2, j + length))
+        return spans
+
+    def _common_prefix(self, text1, text2, i, j):
+        """Length of the common prefix of text1[i:] and text2[j:] using block compares"""
+        limit = min(len(text1) - i, len(text2) - j)
+        length = 0
+        step = 64
+        while step:
+            while length + step <= limit and text1[i+length:i+length+step] == text2[j+length:j+length+step]:
+                length += step
+            step //= 2
+        return length
+
+    def _merge_spans(self, spans):
+        """Chain overlapping or nearby spans that stay close to the same alignment"""
+        chains = []
+        active = []
+        for start1, end1, start2, end2 in sorted(spans):
+            active = [c for c in active if c[1] + self.max_gap >= start1]
+            for chain in active:
+                gap1, gap2 = start1 - chain[1], start2 - chain[3]
+                if start2 >= chain[2] and gap2 <= self.max_gap and abs(gap1 - gap2) <= self.max_gap:
+                    chain[4] += max(0, end1 - max(start1, chain[1]))
+                    chain[1] = max(chain[1], end1)
+                    chain[3] = max(chain[3], end2)
+                    break
+            else:
+                chain = [start1, end1, start2, end2, end1 - start1]
+                chains.append(chain)
+                active.append(chain)
+        return sorted(chains)
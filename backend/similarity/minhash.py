@@ -0,0 +1,50 @@
+import hashlib
+import numpy as np
+from config import Config
+
+_PRIME = np.uint64(4294967291)  # largest prime below 2**32, so hash values fit in uint32
+_EMPTY = np.uint32(0xFFFFFFFF)  # signature value of an empty set; never produced by a hash
+_BLOCK = 4096  # shingles hashed per NumPy block, bounding memory to _BLOCK x num_perm
+
+def shingle_hashes(shingles):
+    """32-bit hashes of byte shingles as a uint64 array"""
+    digests = b''.join(hashlib.blake2b(shingle, digest_size=4).digest() for shingle in shingles)
+    return np.frombuffer(digests, dtype='<u4').astype(np.uint64)
+
+class MinHashSigner:
+    """Computes MinHash signatures as uint32 arrays, num_perm hash functions at a time.
+
+    Each permutation is the universal hash (a*x + b) mod p, applied to a whole
+    block of shingle hashes with one broadcast. Signatures from signers with the
+    same num_perm and seed are comparable, also after being stored and reloaded.
+    """
+    def __init__(self, num_perm=Config.MINHASH_PERMUTATIONS, seed=1):
+        self.num_perm = num_perm
+        self.seed = seed
+        rng = np.random.RandomState(seed)
+        # a < 2**31 keeps a*x + b below 2**64 for 32-bit x
+        self.a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingles):
+        signature = np.full(self.num_perm, _EMPTY, dtype=np.uint32)
+        hashes = shingle_hashes(shingles)
+        for start in range(0, len(hashes), _BLOCK):
+            block = hashes[start:start + _BLOCK, np.newaxis]
+            values = (block * self.a + self.b) % _PRIME
+            np.minimum(signature, values.min(axis=0).astype(np.uint32), out=signature)
+        return signature
+
+def estimate_jaccard(signature1, signature2):
+    """Jaccard estimate from two stored signatures: the share of equal slots"""
+    if len(signature1) != len(signature2):
+        raise ValueError("Signatures have different numbers of permutations")
+    return float(np.count_nonzero(signature1 == signature2)) / len(signature1)
+
+_signers = {}
+
+def get_signer(num_perm=Config.MINHASH_PERMUTATIONS):
+    """Shared signer per permutation count"""
+    if num_perm not in _signers:
+        _signers[num_perm] = MinHashSigner(num_perm)
+    return _signers[num_perm]
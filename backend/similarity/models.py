@@ -0,0 +1,37 @@
+import threading
+import time
+from config import Config
+
+class LazyCrossEncoder:
+    """Cross-encoder that is only loaded (and torch only imported) on first use"""
+    def __init__(self, name=Config.SEMANTIC_MODEL):
+        self.name = name
+        self.load_seconds = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.name)
+                    self.load_seconds = time.perf_counter() - start
+        return self._model
+
+    def predict(self, pairs, **kwargs):
+        return self.load().predict(pairs, **kwargs)
+
+_cross_encoder = None
+
+def get_cross_encoder():
+    """The process-wide cross-encoder shared by every TextAnalyzer"""
+    global _cross_encoder
+    if _cross_encoder is None:
+        _cross_encoder = LazyCrossEncoder()
+    return _cross_encoder
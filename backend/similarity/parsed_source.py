@@ -0,0 +1,70 @@
+import ast
+from collections import defaultdict
+import javalang
+from config import Config
+from similarity.code_tokens import code_tokens, normalize_code
+from similarity.ast_hash import python_subtree_index, java_subtree_index
+from utils.caching import sized_lru_cache
+
+class ParsedSource:
+    """Everything the Python metrics need from one source, derived from a single ast.parse"""
+    def __init__(self, code):
+        self.code = code
+        self.tree = ast.parse(code)
+        self.functions = []
+        self.variables = defaultdict(int)
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.FunctionDef):
+                self.functions.append((node.name, len(node.args.args)))
+            elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+                self.variables[node.id] += 1
+        self.normalized = normalize_code(code, 'python')
+        self.tokens = code_tokens(code, 'python')
+        self.subtrees = python_subtree_index(self.tree)
+
+class JavaSource:
+    """Everything the Java metrics need from one source, derived from a single javalang parse"""
+    def __init__(self, code):
+        self.code = code
+        self.tree = javalang.parse.parse(code)
+        self.classes = [path.name for path in self.tree.types if isinstance(path, javalang.tree.ClassDeclaration)]
+        self.methods = []
+        for path in self.tree.types:
+            if isinstance(path, javalang.tree.ClassDeclaration):
+                for member in path.body:
+                    if isinstance(member, javalang.tree.MethodDeclaration):
+                        self.methods.append((member.name, len(member.parameters)))
+        self.imports = {imp.path for imp in self.tree.imports}
+        self.method_bodies = {}
+        for _, node in self.tree.filter(javalang.tree.MethodDeclaration):
+            self.method_bodies.setdefault(_body_fingerprint(node), []).append(node.name)
+        for _, node in self.tree.filter(javalang.tree.ConstructorDeclaration):
+            self.method_bodies.setdefault(_body_fingerprint(node), []).append(node.name)
+        self.method_bodies.pop(None, None)
+        self.normalized = normalize_code(code, 'java')
+        self.tokens = code_tokens(code, 'java')
+        self.subtrees = java_subtree_index(self.tree)
+
+def _body_fingerprint(method):
+    """Hash of a method body's statement structure: statement kinds, nesting and expression kinds.
+
+    Names, literals and types are ignored, so a renamed copy gets the same fingerprint.
+    Bodies with fewer than two statements are too generic to fingerprint.
+    """
+    shape = []
+    for path, node in method:
+        if isinstance(node, (javalang.tree.Statement, javalang.tree.LocalVariableDeclaration)):
+            expression = getattr(node, 'expression', None)
+            shape.append((len(path), type(node).__name__, type(expression).__name__))
+    return hash(tuple(shape)) if len(shape) >= 2 else None
+
+# Trees, tokens and subtree indexes hold about 70-90 bytes per character of source
+@sized_lru_cache(Config.PARSE_CACHE_MAX_BYTES, bytes_per_char=96)
+def parse_python(code):
+    """Memoized ParsedSource, so a submission compared many times is parsed once"""
+    return ParsedSource(code)
+
+@sized_lru_cache(Config.PARSE_CACHE_MAX_BYTES, bytes_per_char=96)
+def parse_java(code):
+    """Memoized JavaSource, so a submission compared many times is parsed once"""
+    return JavaSource(code)
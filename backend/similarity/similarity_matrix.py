@@ -0,0 +1,174 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from similarity.artifacts import document_artifacts, _IDF_UNIQUE
+from config import Config
+
+# Peak bytes per cell of a block, measured on the cosine phase: two dense
+# float64 norm arrays, the dense dot products and the sparse product being
+# densified. The Jaccard and MinHash phases need less and run before it.
+_BYTES_PER_CELL = 80
+
+def _sparse_rows(rows, vocabulary):
+    """CSR matrix from one {column key: value} mapping per document"""
+    indptr, indices, data = [0], [], []
+    for row in rows:
+        for key, value in row.items():
+            indices.append(vocabulary.setdefault(key, len(vocabulary)))
+            data.append(value)
+        indptr.append(len(indices))
+    return csr_matrix((np.array(data, dtype=np.float64), np.array(indices, dtype=np.int32), indptr),
+                      shape=(len(rows), len(vocabulary)))
+
+class SimilarityMatrix:
+    """Jaccard, MinHash and TF-IDF cosine for every pair of a set of documents.
+
+    Each document is tokenized once. The scores are the same as
+    TextAnalyzer's per-pair metrics; the pairwise TF-IDF cosine, whose IDF
+    depends only on which terms the two documents share, is rebuilt from
+    three sparse products over raw term counts:
+
+        dot    = C C^T
+        shared = (C*C) B^T   (squared counts of a row's terms the other row also has)
+
+    Rows are processed in blocks sized so the dense per-block results stay
+    within memory_budget bytes.
+    """
+    def __init__(self, texts, memory_budget=Config.MATRIX_MEMORY_BUDGET):
+        self.size = len(texts)
+        self.memory_budget = memory_budget
+        docs = [document_artifacts(text) for text in texts]
+        terms = {}
+        self.counts = _sparse_rows([doc.term_counts for doc in docs], terms)
+        self.squared = self.counts.multiply(self.counts).tocsr()
+        self.presence = (self.counts > 0).astype(np.float64).tocsr()
+        self.term_norms = np.asarray(self.squared.sum(axis=1)).ravel()
+        self.tokens = _sparse_rows([dict.fromkeys(doc.token_set, 1.0) for doc in docs], {})
+        self.token_counts = np.asarray(self.tokens.sum(axis=1)).ravel()
+        # Right-hand operands transposed once; transposing per block copies the whole matrix each time
+        self.counts_t = self.counts.T.tocsr()
+        self.squared_t = self.squared.T.tocsr()
+        self.presence_t = self.presence.T.tocsr()
+        self.tokens_t = self.tokens.T.tocsr()
+        self.signatures = np.vstack([doc.signature() for doc in docs]) if docs else np.zeros((0, 0), np.uint32)
+
+    def block_rows(self):
+        return max(1, int(self.memory_budget // (max(self.size, 1) * _BYTES_PER_CELL)))
+
+    def blocks(self, metric='cosine'):
+        """Yield (row_start, scores) for one metric, scores[r, c] being rows row_start + r and row_start + c.
+
+        Only columns from row_start on are computed, so each unordered pair
+        appears once (and each document is paired with itself on the diagonal).
+        """
+        score = {'jaccard': self._jaccard, 'minhash': self._minhash, 'cosine': self._cosine}[metric]
+        for start, stop in self._ranges():
+            yield start, score(start, stop)
+
+    def pairs(self, threshold=Config.CASCADE_DETAILED_THRESHOLD, lexical_threshold=Config.CASCADE_LEXICAL_THRESHOLD):
+        """Pairs (i, j, scores) that the text cascade would send to its detailed tier.
+
+        Metrics are computed one at a time per block and only the cells still
+        passing are kept, so a block never holds more than one metric's scores.
+        """
+        flagged = []
+        for start, stop in self._ranges():
+            jaccard = self._jaccard(start, stop)
+            passing = np.triu(jaccard >= lexical_threshold, k=1)
+            minhash = self._minhash(start, stop)
+            rows, cols = np.nonzero(np.triu(minhash >= lexical_threshold, k=1) | passing)
+            del passing
+            scores = {'jaccard': jaccard[rows, cols], 'minhash': minhash[rows, cols]}
+            del jaccard, minhash
+            if not len(rows):
+                continue
+            cosine = self._cosine(start, stop)
+            scores['cosine'] = cosine[rows, cols]
+            del cosine
+            keep = scores['cosine'] >= threshold
+            for k in np.nonzero(keep)[0]:
+                flagged.append((int(start + rows[k]), int(start + cols[k]),
+                                {metric: float(values[k]) for metric, values in scores.items()}))
+        return flagged
+
+    def _ranges(self):
+        step = self.block_rows()
+        for start in range(0, self.size, step):
+            yield start, min(start + step, self.size)
+
+    def _product(self, left, right_t, start, stop):
+        """Dense block of left[start:stop] @ right^T, columns from start on"""
+        return (left[start:stop] @ right_t).toarray()[:, start:]
+
+    def _jaccard(self, start, stop):
+        scores = self._product(self.tokens, self.tokens_t, start, stop)  # intersections
+        union = self.token_counts[start:stop, None] + self.token_counts[None, start:]
+        union -= scores
+        np.divide(scores, union, out=scores, where=union > 0)
+        return scores
+
+    def _minhash(self, start, stop):
+        return _agreement(self.signatures, start, stop)
+
+    def _cosine(self, start, stop):
+        # norm = u2 * total + (1 - u2) * shared for each side, built in place to bound memory
+        unique_weight = _IDF_UNIQUE ** 2
+        norms = self._product(self.squared, self.presence_t, start, stop)
+        norms *= 1 - unique_weight
+        norms += unique_weight * self.term_norms[start:stop, None]
+        other = self._product(self.presence, self.squared_t, start, stop)
+        other *= 1 - unique_weight
+        other += unique_weight * self.term_norms[None, start:]
+        norms *= other
+        del other
+        np.sqrt(norms, out=norms)
+        scores = self._product(self.counts, self.counts_t, start, stop)  # dot products
+        np.divide(scores, norms, out=scores, where=norms > 0)
+        return scores
+
+def _agreement(signatures, start, stop):
+    """Share of equal MinHash slots between rows start:stop and every row from start on"""
+    rows, cols = signatures[start:stop], signatures[start:]
+    num_perm = signatures.shape[1]
+    agree = np.zeros((stop - start, len(signatures) - start), dtype=np.int16)
+    # One permutation at a time keeps memory at one cell per pair instead of num_perm
+    for k in range(num_perm):
+        agree += rows[:, k, None] == cols[None, :, k]
+    return agree / num_perm if num_perm else agree.astype(np.float64)
+
+def minhash_pairs(signatures, threshold, memory_budget=Config.MATRIX_MEMORY_BUDGET):
+    """Pairs (i, j, estimate) of stacked MinHash signatures whose Jaccard estimate reaches threshold"""
+    size = len(signatures)
+    step = max(1, int(memory_budget // (max(size, 1) * _BYTES_PER_CELL)))
+    flagged = []
+    for start in range(0, size, step):
+        scores = _agreement(signatures, start, min(start + step, size))
+        rows, cols = np.nonzero(np.triu(scores >= threshold, k=1))
+        flagged.extend((int(start + r), int(start + c), float(scores[r, c])) for r, c in zip(rows, cols))
+    return flagged
+
+def cluster_pairs(pairs, size):
+    """Connected groups of documents linked by flagged (i, j, score) pairs, largest first.
+
+    Returns [{'members': [indices], 'pairs': edge count, 'max_score': strongest link}].
+    """
+    parent = list(range(size))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j, _ in pairs:
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[root_j] = root_i
+
+    clusters = {}
+    for i, j, score in pairs:
+        cluster = clusters.setdefault(find(i), {'members': set(), 'pairs': 0, 'max_score': 0.0})
+        cluster['members'].update((i, j))
+        cluster['pairs'] += 1
+        cluster['max_score'] = max(cluster['max_score'], score)
+    result = [dict(cluster, members=sorted(cluster['members'])) for cluster in clusters.values()]
+    return sorted(result, key=lambda c: (-len(c['members']), -c['max_score']))
@@ -0,0 +1,166 @@
+from config import Config
+
+class SuffixAutomaton:
+    """Suffix automaton of one text, for exact longest-common-substring queries.
+
+    Built in O(n) states and transitions; matching another text against it is
+    linear in that text's length.
+    """
+    def __init__(self, text):
+        self.text = text
+        self.next = [{}]
+        self.link = [-1]
+        self.length = [0]
+        self.first = [-1]  # end index of the first occurrence of each state's strings
+        last = 0
+        for i, ch in enumerate(text):
+            last = self._extend(last, ch, i)
+
+    def _extend(self, last, ch, i):
+        next_, link, length, first = self.next, self.link, self.length, self.first
+        cur = len(length)
+        next_.append({})
+        link.append(0)
+        length.append(length[last] + 1)
+        first.append(i)
+        p = last
+        while p != -1 and ch not in next_[p]:
+            next_[p][ch] = cur
+            p = link[p]
+        if p != -1:
+            q = next_[p][ch]
+            if length[p] + 1 == length[q]:
+                link[cur] = q
+            else:
+                clone = len(length)
+                next_.append(dict(next_[q]))
+                link.append(link[q])
+                length.append(length[p] + 1)
+                first.append(first[q])
+                while p != -1 and next_[p].get(ch) == q:
+                    next_[p][ch] = clone
+                    p = link[p]
+                link[q] = link[cur] = clone
+        return cur
+
+    def matching_statistics(self, other):
+        """For each end index j of `other`, the longest substring ending there that occurs in the text.
+
+        Yields (length, j, state).
+        """
+        next_, link, length = self.next, self.link, self.length
+        state, matched = 0, 0
+        for j, ch in enumerate(other):
+            while state and ch not in next_[state]:
+                state = link[state]
+                matched = length[state]
+            if ch in next_[state]:
+                state = next_[state][ch]
+                matched += 1
+            else:
+                state, matched = 0, 0
+            yield matched, j, state
+
+    def common_substrings(self, other, top_n=Config.LCS_TOP_N, min_length=1):
+        """Longest non-overlapping common substrings, longest first.
+
+        Each is (start, other_start, length); spans overlapping a longer
+        substring already chosen in either text are skipped.
+        """
+        stats = list(self.matching_statistics(other))
+        candidates = []
+        for idx, (matched, j, state) in enumerate(stats):
+            # Keep only matches that cannot be extended to the right
+            if matched >= min_length and (idx + 1 == len(stats) or stats[idx + 1][0] != matched + 1):
+                candidates.append((matched, self.first[state] - matched + 1, j - matched + 1))
+        return _select(candidates, top_n)
+
+def _select(candidates, top_n):
+    """Longest (length, start, other_start) candidates first, skipping spans overlapping a chosen one"""
+    candidates.sort(key=lambda c: (-c[0], c[2]))
+    chosen = []
+    for matched, start, other_start in candidates:
+        if len(chosen) >= top_n:
+            break
+        if any(start < s + n and s < start + matched or other_start < o + n and o < other_start + matched
+               for s, o, n in chosen):
+            continue
+        chosen.append((start, other_start, matched))
+    return chosen
+
+def _extent(text1, i, text2, j, backward=False):
+    """Length of the common run starting (or, backward, ending) at i and j.
+
+    Galloping then binary search on slice comparisons, so the cost grows with
+    the run found rather than with the text left to compare.
+    """
+    limit = min(i, j) if backward else min(len(text1) - i, len(text2) - j)
+
+    def same(n):
+        return text1[i - n:i] == text2[j - n:j] if backward else text1[i:i + n] == text2[j:j + n]
+
+    lo, step = 0, 8
+    while lo < limit:
+        hi = min(lo + step, limit)
+        if not same(hi):
+            break
+        lo, step = hi, step * 2
+    else:
+        return limit
+    # The run ends somewhere in (lo, hi)
+    while lo + 1 < hi:
+        mid = (lo + hi) // 2
+        if same(mid):
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+def anchored_common_substrings(text1, text2, top_n=Config.LCS_TOP_N, min_length=1,
+                               anchor=Config.LCS_ANCHOR_SIZE, max_occurrences=16):
+    """Common substrings found from anchors, for texts too long for the automaton.
+
+    Every `anchor`-th window of `anchor` characters in text1 is indexed; each
+    hit in text2 is extended exactly in both directions. Any common substring
+    of at least 2 * anchor - 1 characters contains an indexed window, so those
+    are found with their exact length; shorter ones may be missed. A window
+    repeated more than max_occurrences times in text1 keeps only its first
+    occurrences.
+    """
+    k = anchor
+    index = {}
+    for i in range(0, len(text1) - k + 1, k):
+        positions = index.setdefault(text1[i:i + k], [])
+        if len(positions) < max_occurrences:
+            positions.append(i)
+    covered = {}  # diagonal -> end in text2 of the span already extended on it
+    candidates = []
+    for j in range(len(text2) - k + 1):
+        positions = index.get(text2[j:j + k])
+        if not positions:
+            continue
+        for i in positions:
+            if covered.get(i - j, -1) > j:
+                continue
+            left = _extent(text1, i, text2, j, backward=True)
+            right = _extent(text1, i + k, text2, j + k)
+            covered[i - j] = j + k + right
+            if left + k + right >= min_length:
+                candidates.append((left + k + right, i - left, j - left))
+    return _select(candidates, top_n)
+
+def common_substrings(text1, text2, top_n=Config.LCS_TOP_N, min_length=1):
+    """Top-N non-overlapping common substrings of two texts as (start1, start2, length).
+
+    The automaton is built over the shorter text to bound memory. It is exact
+    but heavy in pure Python, about 0.6 KB and several microseconds per
+    character, so once the shorter text exceeds LCS_EXACT_MAX_LENGTH the
+    anchored search is used instead.
+    """
+    swap = len(text1) > len(text2)
+    short, other = (text2, text1) if swap else (text1, text2)
+    if len(short) > Config.LCS_EXACT_MAX_LENGTH:
+        found = anchored_common_substrings(short, other, top_n, min_length)
+    else:
+        found = SuffixAutomaton(short).common_substrings(other, top_n, min_length)
+    return [(start2, start1, length) for start1, start2, length in found] if swap else found
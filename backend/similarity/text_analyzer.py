@@ -1,64 +1,127 @@
+import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from Levenshtein import distance as levenshtein_distance
-from datasketch import MinHash
-from sentence_transformers import CrossEncoder
-from difflib import SequenceMatcher
+from similarity.match_finder import MatchFinder
+from similarity.edit_distance import BoundedLevenshtein
+from similarity.substring import common_substrings
+from similarity.artifacts import TOKEN_PATTERN, document_artifacts, tfidf_cosine
+from similarity.minhash import estimate_jaccard
+from similarity.inference import BatchScheduler
+from similarity.models import get_cross_encoder
+from utils.instrumentation import timed
+from config import Config
 
 class TextAnalyzer:
     def __init__(self):
-        self.cross_encoder = CrossEncoder('cross-encoder/stsb-roberta-large')
+        self.cross_encoder = get_cross_encoder()
+        self.semantic_scheduler = BatchScheduler(self.cross_encoder)
+        self.match_finder = MatchFinder()
+        self.edit_distance = BoundedLevenshtein()
     
-    def compare(self, text1, text2):
-        clean1, clean2 = self._preprocess(text1), self._preprocess(text2)
-        
+    def compare(self, text1, text2, progress=None, cascade=None):
+        """Score a pair of texts.
+
+        With `cascade` (default Config.TEXT_CASCADE) the metrics run in tiers and
+        stop once a pair is clearly unrelated: lexical (jaccard, minhash), then
+        tfidf (cosine), then detailed (levenshtein, semantic, longest match,
+        heatmap, matches). Skipped metrics are left out of details and the score.
+        """
+        progress = progress or (lambda stage: None)
+        progress('metrics')
+        result = self._screen(text1, text2, cascade)
+        if 'detailed' in result['tiers']:
+            semantic = self.semantic_scheduler.submit(text1, text2)
+            self._detailed(text1, text2, result, semantic, progress)
+        return self._finish(result)
+    
+    def compare_many(self, pairs, cascade=None):
+        """Score many (text1, text2) pairs, e.g. a corpus query's candidates.
+
+        Every pair reaching the detailed tier is queued for semantic scoring
+        before any is waited on, so the cross-encoder scores them in shared batches.
+        """
+        results = [self._screen(text1, text2, cascade) for text1, text2 in pairs]
+        semantic = [
+            self.semantic_scheduler.submit(text1, text2) if 'detailed' in result['tiers'] else None
+            for (text1, text2), result in zip(pairs, results)
+        ]
+        for (text1, text2), result, future in zip(pairs, results, semantic):
+            if future is not None:
+                self._detailed(text1, text2, result, future)
+        return [self._finish(result) for result in results]
+    
+    def _screen(self, text1, text2, cascade):
+        """Lexical and tfidf tiers, marking whether the pair goes on to the detailed tier"""
+        cascade = Config.TEXT_CASCADE if cascade is None else cascade
+        # Shared per-document views; each is derived once and reused by every metric
+        doc1, doc2 = document_artifacts(text1), document_artifacts(text2)
+        tiers = ['lexical']
         metrics = {
-            'jaccard': float(self._jaccard_similarity(clean1, clean2)),
-            'cosine': float(self._cosine_similarity(clean1, clean2)),
-            'levenshtein': float(self._levenshtein_similarity(text1, text2)),
-            'minhash': float(self._minhash_similarity(clean1, clean2)),
-            'semantic': float(self._semantic_similarity(text1, text2)),
-            'longest_match': float(self._longest_common_substring(text1, text2))
+            'jaccard': float(self._jaccard_similarity(doc1, doc2)),
+            'minhash': float(self._minhash_similarity(doc1, doc2))
         }
+        if not cascade or max(metrics['jaccard'], metrics['minhash']) >= Config.CASCADE_LEXICAL_THRESHOLD:
+            tiers.append('tfidf')
+            metrics['cosine'] = float(self._cosine_similarity(doc1, doc2))
+            if not cascade or metrics['cosine'] >= Config.CASCADE_DETAILED_THRESHOLD:
+                tiers.append('detailed')
+        return {'heatmap': [], 'matches': [], 'details': metrics, 'tiers': tiers}
+    
+    def _detailed(self, text1, text2, result, semantic, progress=None):
+        """Expensive metrics; the semantic score is already queued and collected last"""
+        progress = progress or (lambda stage: None)
+        metrics = result['details']
+        doc1, doc2 = document_artifacts(text1), document_artifacts(text2)
+        edit_distance = self.edit_distance.compare(text1, text2)
+        metrics['levenshtein'] = float(edit_distance['similarity'])
+        substrings = self._common_substrings(text1, text2)
+        metrics['longest_match'] = float(substrings[0]['length'] / max(len(text1), len(text2)) if substrings else 0.0)
+        result['edit_distance'] = edit_distance
+        result['common_substrings'] = substrings
         
-        return {
-            'details': metrics,
-            'score': float(self._calculate_score(metrics)),
-            'heatmap': [[float(val) for val in row] for row in self._generate_heatmap(clean1, clean2)],
-            'matches': self._find_matches(text1, text2)
-        }
+        progress('heatmap')
+        result['heatmap'] = [[float(val) for val in row] for row in self._generate_heatmap(doc1.normalized, doc2.normalized)]
+        
+        progress('matches')
+        result['matches'] = self._find_matches(text1, text2)
+        metrics['semantic'] = float(self._semantic_similarity(semantic))
     
-    def _preprocess(self, text):
-        return text.lower().strip()
+    def _finish(self, result):
+        result['score'] = float(self._calculate_score(result['details']))
+        return result
     
-    def _jaccard_similarity(self, text1, text2):
-        a, b = set(text1.split()), set(text2.split())
+    @timed('text.jaccard')
+    def _jaccard_similarity(self, doc1, doc2):
+        a, b = doc1.token_set, doc2.token_set
         return len(a & b) / len(a | b) if (a | b) else 0
     
-    def _cosine_similarity(self, text1, text2):
-        vectorizer = TfidfVectorizer(ngram_range=(1, 3), token_pattern=r"(?u)\\b\\w+\\b|[A-Za-z_][A-Za-z0-9_]*|\\S")
-        try:
-            tfidf = vectorizer.fit_transform([text1, text2])
-            return cosine_similarity(tfidf[0], tfidf[1])[0][0]
-        except ValueError:
-            return 0.0
-    
-    def _levenshtein_similarity(self, text1, text2):
-        max_len = max(len(text1), len(text2))
-        return 1 - (levenshtein_distance(text1, text2) / max_len) if max_len else 0
+    @timed('text.cosine')
+    def _cosine_similarity(self, doc1, doc2):
+        return tfidf_cosine(doc1, doc2)
     
-    def _minhash_similarity(self, text1, text2):
-        m1, m2 = MinHash(num_perm=128), MinHash(num_perm=128)
-        for word in text1.split(): m1.update(word.encode('utf8'))
-        for word in text2.split(): m2.update(word.encode('utf8'))
-        return m1.jaccard(m2)
+    @timed('text.minhash')
+    def _minhash_similarity(self, doc1, doc2):
+        return estimate_jaccard(doc1.signature(), doc2.signature())
     
-    def _semantic_similarity(self, text1, text2):
-        return self.cross_encoder.predict([(text1, text2)])[0]
+    @timed('text.semantic')
+    def _semantic_similarity(self, future):
+        """Wait for a queued cross-encoder score"""
+        return future.result()
     
-    def _longest_common_substring(self, text1, text2):
-        match = SequenceMatcher(None, text1, text2).find_longest_match()
-        return match.size / max(len(text1), len(text2))
+    @timed('text.longest_match')
+    def _common_substrings(self, text1, text2):
+        """Exact longest common substring first, then the next longest non-overlapping ones"""
+        found = common_substrings(text1, text2, Config.LCS_TOP_N)
+        return [
+            {
+                'text1_start': start1,
+                'text1_end': start1 + length,
+                'text2_start': start2,
+                'text2_end': start2 + length,
+                'length': length
+            }
+            for i, (start1, start2, length) in enumerate(found)
+            if i == 0 or length >= Config.LCS_MIN_LENGTH
+        ]
     
     def _calculate_score(self, metrics):
         weights = {
@@ -69,32 +132,47 @@ class TextAnalyzer:
             'semantic': 0.15,
             'longest_match': 0.05
         }
-        return sum(metrics[k] * weights[k] for k in weights)
+        # Weights of metrics a cascade skipped are shared among the ones that ran
+        total = sum(weights[k] for k in metrics)
+        return sum(metrics[k] * weights[k] for k in metrics) / total
     
-    def _generate_heatmap(self, text1, text2, window_size=30):
-        windows1 = [text1[i:i+window_size] for i in range(0, len(text1), window_size//2)]
-        windows2 = [text2[i:i+window_size] for i in range(0, len(text2), window_size//2)]
-        
-        return [
-            [self._cosine_similarity(w1, w2) for w2 in windows2[:20]] 
-            for w1 in windows1[:20]
-        ]
+    @timed('text.heatmap')
+    def _generate_heatmap(self, text1, text2, window_size=30, resolution=Config.HEATMAP_RESOLUTION):
+        """Window-vs-window cosine similarity over both full documents.
+
+        All windows share one TF-IDF fit, so each cell is a row of a sparse matrix
+        product. With `resolution` set the windows are max-pooled into at most
+        resolution x resolution cells; with None every window pair gets a cell.
+        """
+        step = max(1, window_size // 2)
+        windows1 = [text1[i:i+window_size] for i in range(0, len(text1), step)]
+        windows2 = [text2[i:i+window_size] for i in range(0, len(text2), step)]
+        if not windows1 or not windows2:
+            return []
+
+        rows = len(windows1) if resolution is None else min(resolution, len(windows1))
+        cols = len(windows2) if resolution is None else min(resolution, len(windows2))
+        vectorizer = TfidfVectorizer(ngram_range=(1, 3), token_pattern=TOKEN_PATTERN)
+        try:
+            tfidf = vectorizer.fit_transform(windows1 + windows2)
+        except ValueError:
+            return np.zeros((rows, cols))
+
+        # Rows are L2-normalized, so the dot product is the cosine similarity
+        vectors1, vectors2 = tfidf[:len(windows1)], tfidf[len(windows1):].T.tocsc()
+        if resolution is None:
+            return (vectors1 @ vectors2).toarray()
+
+        # Multiply one strip of rows at a time so memory stays bounded on long documents
+        row_bounds = np.linspace(0, len(windows1), rows + 1).astype(int)
+        col_starts = np.linspace(0, len(windows2), cols + 1).astype(int)[:-1]
+        heatmap = np.zeros((rows, cols))
+        for r in range(rows):
+            strip = vectors1[row_bounds[r]:row_bounds[r+1]] @ vectors2
+            heatmap[r] = np.maximum.reduceat(strip.max(axis=0).toarray().ravel(), col_starts)
+        return heatmap
     
+    @timed('text.matches')
     def _find_matches(self, text1, text2, threshold=0.7):
-        matches = []
-        len1, len2 = len(text1), len(text2)
-        
-        for i in range(0, len1, 50):
-            for j in range(0, len2, 50):
-                section1 = text1[i:i+100]
-                section2 = text2[j:j+100]
-                similarity = self._cosine_similarity(section1, section2)
-                if similarity > threshold:
-                    matches.append({
-                        'text1_start': i,
-                        'text1_end': i+100,
-                        'text2_start': j,
-                        'text2_end': j+100,
-                        'similarity': similarity
-                    })
-        return matches
\ No newline at end of file
+        """Find aligned copied spans via winnowed seeds extended along their diagonal"""
+        return self.match_finder.find(text1, text2, threshold)
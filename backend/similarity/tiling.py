@@ -0,0 +1,90 @@
+from collections import defaultdict
+from config import Config
+
+_BASE = 1000003
+_MOD = (1 << 61) - 1
+
+class GreedyStringTiler:
+    """Running-Karp-Rabin Greedy String Tiling (Wise 1993) over token streams"""
+    def __init__(self, min_match=Config.GST_MIN_MATCH, initial_search=Config.GST_INITIAL_SEARCH):
+        self.min_match = min_match
+        self.initial_search = max(initial_search, min_match)
+
+    def tile(self, tokens1, tokens2):
+        """Return non-overlapping tiles as (start1, start2, length) in token indices"""
+        vocabulary = {}
+        a = [vocabulary.setdefault(t, len(vocabulary) + 1) for t in tokens1]
+        b = [vocabulary.setdefault(t, len(vocabulary) + 1) for t in tokens2]
+        marked_a, marked_b = bytearray(len(a)), bytearray(len(b))
+        tiles = []
+        search = self.initial_search
+        while True:
+            longest, matches = self._scan(a, b, marked_a, marked_b, search)
+            if longest > 2 * search:
+                # Much longer matches exist; rescan at that length before marking
+                search = longest
+                continue
+            added = self._mark(matches, marked_a, marked_b, tiles)
+            if search > 2 * self.min_match:
+                search //= 2
+            elif search > self.min_match:
+                search = self.min_match
+            elif not added:
+                # Matches occluded in this pass may be free now; stop only once a pass marks nothing
+                break
+        return sorted(tiles)
+
+    def coverage(self, tiles, length1, length2):
+        """Share of both token streams covered by tiles"""
+        if not length1 and not length2:
+            return 1.0
+        return 2 * sum(length for _, _, length in tiles) / (length1 + length2)
+
+    def _window_hashes(self, seq, marked, size):
+        """Karp-Rabin hashes of every fully unmarked window of `size` tokens"""
+        power = pow(_BASE, size - 1, _MOD)
+        h = 0
+        unmarked_run = 0
+        for idx, token in enumerate(seq):
+            if idx >= size:
+                h = (h - seq[idx - size] * power) % _MOD
+            h = (h * _BASE + token) % _MOD
+            unmarked_run = 0 if marked[idx] else unmarked_run + 1
+            if unmarked_run >= size:
+                yield idx - size + 1, h
+
+    def _scan(self, a, b, marked_a, marked_b, size):
+        if len(a) < size or len(b) < size:
+            return 0, []
+        table = defaultdict(list)
+        for j, h in self._window_hashes(b, marked_b, size):
+            table[h].append(j)
+
+        longest, matches = 0, []
+        for i, h in self._window_hashes(a, marked_a, size):
+            for j in table.get(h, ()):
+                # Not a maximal start: the same match continues from (i-1, j-1)
+                if i and j and not marked_a[i-1] and not marked_b[j-1] and a[i-1] == b[j-1]:
+                    continue
+                if a[i:i+size] != b[j:j+size]:
+                    continue  # hash collision
+                k = size
+                while (i + k < len(a) and j + k < len(b) and a[i+k] == b[j+k]
+                       and not marked_a[i+k] and not marked_b[j+k]):
+                    k += 1
+                matches.append((k, i, j))
+                longest = max(longest, k)
+        return longest, matches
+
+    def _mark(self, matches, marked_a, marked_b, tiles):
+        """Mark matches as tiles, longest first; returns how many were added"""
+        added = 0
+        for length, i, j in sorted(matches, reverse=True):
+            # Skip matches occluded by a longer tile marked earlier in this pass
+            if any(marked_a[i:i+length]) or any(marked_b[j:j+length]):
+                continue
+            marked_a[i:i+length] = b'\x01' * length
+            marked_b[j:j+length] = b'\x01' * length
+            tiles.append((i, j, length))
+            added += 1
+        return added
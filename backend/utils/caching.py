@@ -0,0 +1,70 @@
+"""Memoization bounded by the memory its entries hold rather than by their count.
+
+Derived views of a document (tokens, parse trees, vectors) grow with the
+document, so a count limit alone lets a few large submissions pin gigabytes
+for the life of a worker. Each entry is charged an estimate of its size,
+usually a measured number of bytes per input character.
+"""
+import functools
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+class SizedCache:
+    """Least recently used entries kept within max_bytes of estimated size.
+
+    A value larger than the whole budget is not stored.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+def sized_lru_cache(max_bytes, bytes_per_char):
+    """Like functools.lru_cache, but each call is charged bytes_per_char per character of its string arguments"""
+    def decorate(fn):
+        cache = SizedCache(max_bytes)
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            value = cache.get(args, _MISSING)
+            if value is _MISSING:
+                value = fn(*args)
+                cache.put(args, value, bytes_per_char * sum(len(arg) for arg in args if isinstance(arg, str)))
+            return value
+
+        wrapper.cache = cache
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorate
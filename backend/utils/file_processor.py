@@ -1,12 +1,28 @@
 import os
+import io
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import PyPDF2
 import docx
 from bs4 import BeautifulSoup
+from utils.instrumentation import timed
 from config import Config
 import sys
+import tempfile
+import time
+def _extract_pages(path, start, end):
+    """Pool worker: extract text from pages [start, end) of the PDF at path"""
+    with open(path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
 class FileProcessor:
-    def __init__(self):
-        pass
+    def __init__(self, cache_folder=Config.PDF_CACHE_FOLDER, workers=Config.PDF_WORKERS):
+        self.cache_folder = cache_folder
+        self.workers = workers  # 1 extracts every PDF in-process
+        self._pool = None
+        self._pool_pid = None
     def process_files(self, file1, file2):
         if not (self._allowed_file(file1.filename) and self._allowed_file(file2.filename)):
             raise ValueError("Unsupported file type")
@@ -25,6 +41,13 @@ class FileProcessor:
         
         return content1, content2, file_type
     
+    def process_file(self, file):
+        if not self._allowed_file(file.filename):
+            raise ValueError("Unsupported file type")
+        
+        ext = os.path.splitext(file.filename)[1].lower()
+        return self._read_file(file, ext), self._get_file_type(ext)
+    
     def _allowed_file(self, filename):
         return '.' in filename and filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
     
@@ -37,6 +60,7 @@ class FileProcessor:
         }
         return mapping.get(extension, 'text')
     
+    @timed('extract', result_size=True)
     def _read_file(self, file, extension):
         if extension == '.pdf':
             return self._read_pdf(file)
@@ -50,12 +74,99 @@ class FileProcessor:
             raise ValueError(f"Unsupported file extension: {extension}")
     
     def _read_pdf(self, file):
-        text = ""
-        reader = PyPDF2.PdfReader(file)
-        for page in reader.pages:
-            text += page.extract_text() or ""
+        data = file.read()
+        if len(data) > Config.PDF_MAX_BYTES:
+            raise ValueError(f"PDF is larger than {Config.PDF_MAX_BYTES // (1024 * 1024)}MB")
+        
+        digest = hashlib.sha256(data).hexdigest()
+        cached = self._cached_text(digest)
+        if cached is not None:
+            return cached
+        
+        reader = PyPDF2.PdfReader(io.BytesIO(data))
+        num_pages = len(reader.pages)
+        if num_pages > Config.PDF_MAX_PAGES:
+            raise ValueError(f"PDF has {num_pages} pages; the limit is {Config.PDF_MAX_PAGES}")
+        
+        if num_pages < Config.PDF_PARALLEL_MIN_PAGES or self.workers <= 1:
+            pages = [page.extract_text() or "" for page in reader.pages]
+        else:
+            pages = self._extract_parallel(data, num_pages)
+        text = "".join(pages)
+        self._store_text(digest, text)
         return text
     
+    def _extract_parallel(self, data, num_pages):
+        # Workers read the PDF from a temp file, one page range each, so the bytes are
+        # neither pickled per task nor parsed more than once per worker
+        pool = self._executor()
+        chunk = -(-num_pages // self.workers)
+        fd, path = tempfile.mkstemp(suffix='.pdf')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            futures = [
+                pool.submit(_extract_pages, path, start, min(start + chunk, num_pages))
+                for start in range(0, num_pages, chunk)
+            ]
+            return [text for future in futures for text in future.result()]
+        finally:
+            os.remove(path)
+    
+    def _executor(self):
+        if self._pool is None or self._pool_pid != os.getpid():
+            context = multiprocessing.get_context('spawn')
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            self._pool_pid = os.getpid()
+        return self._pool
+    
+    def _cached_text(self, digest):
+        path = os.path.join(self.cache_folder, f"{digest}.txt")
+        try:
+            with open(path, encoding='utf-8', errors='surrogatepass') as f:
+                text = f.read()
+            os.utime(path)  # mark as recently used for eviction
+            return text
+        except OSError:
+            return None
+    
+    def _store_text(self, digest, text):
+        os.makedirs(self.cache_folder, exist_ok=True)
+        path = os.path.join(self.cache_folder, f"{digest}.txt")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8', errors='surrogatepass') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        self._evict()
+    
+    def _evict(self):
+        """Drop cached texts older than PDF_CACHE_MAX_AGE, then least recently used ones over PDF_CACHE_MAX_BYTES"""
+        entries = []
+        now = time.time()
+        for entry in os.scandir(self.cache_folder):
+            if not entry.name.endswith('.txt'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > Config.PDF_CACHE_MAX_AGE:
+                self._remove(entry.path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= Config.PDF_CACHE_MAX_BYTES:
+                break
+            self._remove(path)
+            total -= size
+    
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
     def _read_docx(self, file):
         doc = docx.Document(file)
         return "\n".join([para.text for para in doc.paragraphs])
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""Per-stage latency and input-size metrics, rendered in the Prometheus text format.
+
+Metrics live in the process that recorded them; under gunicorn each worker
+serves its own /metrics.
+"""
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    labels = _labels(self.labelnames + ('le',), key + (_format(bound),))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _labels(self.labelnames + ('le',), key + ('+Inf',))
+                lines.append(f"{self.name}_bucket{labels} {state[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {state[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+def _format(value):
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+STAGE_SECONDS = Histogram('analysis_stage_seconds', 'Time spent in each analysis stage', ('stage',))
+STAGE_INPUT_CHARS = Histogram('analysis_stage_input_chars', 'Input size of each analysis stage in characters',
+                              ('stage',), SIZE_BUCKETS)
+REQUESTS = Counter('analysis_requests_total', 'Comparisons run, by file type and outcome', ('file_type', 'status'))
+INFERENCE_SECONDS = Histogram('semantic_inference_seconds', 'Cross-encoder time per micro-batch')
+INFERENCE_BATCH_SIZE = Histogram('semantic_inference_batch_size', 'Pairs per cross-encoder micro-batch',
+                                 buckets=BATCH_BUCKETS)
+PDF_EXPORT_SECONDS = Histogram('pdf_export_seconds', 'Time to render a PDF report')
+
+METRICS = [STAGE_SECONDS, STAGE_INPUT_CHARS, REQUESTS, INFERENCE_SECONDS, INFERENCE_BATCH_SIZE, PDF_EXPORT_SECONDS]
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+# Stage durations of the request being handled, when it asked for a timings block
+_timings = ContextVar('timings', default=None)
+
+@contextmanager
+def collect_timings():
+    """Collect stage durations recorded in this context into a dict"""
+    timings = {}
+    token = _timings.set(timings)
+    start = time.perf_counter()
+    try:
+        yield timings
+    finally:
+        timings['total'] = time.perf_counter() - start
+        _timings.reset(token)
+
+def record_stage(stage, seconds, size=None):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    if size is not None:
+        STAGE_INPUT_CHARS.observe(size, stage=stage)
+    timings = _timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+@contextmanager
+def stage_timer(stage, size=None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start, size)
+
+def _input_size(args):
+    """Characters in the text-like arguments: strings, documents and parsed sources"""
+    size = 0
+    for arg in args:
+        if isinstance(arg, str):
+            size += len(arg)
+        elif isinstance(getattr(arg, 'text', None), str):
+            size += len(arg.text)
+        elif isinstance(getattr(arg, 'code', None), str):
+            size += len(arg.code)
+    return size or None
+
+def timed(stage, result_size=False):
+    """Decorate a method so each call records its duration and input size under `stage`.
+
+    With result_size the size is taken from the returned text instead, for
+    stages such as extraction whose input is a file.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            result = None
+            try:
+                result = fn(self, *args, **kwargs)
+                return result
+            finally:
+                size = len(result) if result_size and isinstance(result, str) else _input_size(args)
+                record_stage(stage, time.perf_counter() - start, size)
+        return wrapper
+    return decorator
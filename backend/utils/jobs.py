@@ -0,0 +1,150 @@
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import datetime
+from werkzeug.datastructures import FileStorage
+from config import Config
+from utils.pipeline import AnalysisPipeline
+
+class JobStore:
+    """SQLite-backed job state, shared by every web worker and job process"""
+    FIELDS = ('id', 'status', 'stage', 'progress', 'file1_name', 'file2_name', 'error', 'created', 'updated')
+
+    def __init__(self, path=Config.JOBS_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, status TEXT, stage TEXT, progress REAL, '
+                'file1_name TEXT, file2_name TEXT, error TEXT, result TEXT, '
+                'created TEXT, updated TEXT)'
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self, file1_name, file2_name):
+        job_id = uuid.uuid4().hex
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, status, stage, progress, file1_name, file2_name, created, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, 'queued', 'queued', 0.0, file1_name, file2_name, now, now)
+            )
+        return job_id
+
+    def update(self, job_id, **fields):
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'])
+        fields['updated'] = datetime.now().isoformat()
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        with self._connect() as conn:
+            conn.execute(f'UPDATE jobs SET {columns} WHERE id = ?', (*fields.values(), job_id))
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {', '.join(self.FIELDS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(zip(self.FIELDS, row)) if row else None
+
+    def result(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute('SELECT result FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+class JobManager:
+    """Runs /analyze jobs on a local process pool so request threads never wait on analysis"""
+    def __init__(self, store, upload_folder=Config.UPLOAD_FOLDER, max_workers=Config.JOB_WORKERS):
+        self.store = store
+        self.upload_folder = upload_folder
+        self.max_workers = max_workers
+        self._pool = None
+        self._pid = None
+
+    def submit(self, file1, file2):
+        job_id = self.store.create(file1.filename, file2.filename)
+        job_dir = os.path.join(self.upload_folder, job_id)
+        try:
+            os.makedirs(job_dir, exist_ok=True)
+            # Uploads are stored under fixed names; the original names only pick the reader
+            file1.save(os.path.join(job_dir, 'file1'))
+            file2.save(os.path.join(job_dir, 'file2'))
+            args = (run_job, self.store.path, job_id, job_dir, file1.filename, file2.filename)
+            try:
+                future = self._executor().submit(*args)
+            except BrokenProcessPool:
+                # A job process died (e.g. out of memory) and took the pool with it
+                self._pool = None
+                future = self._executor().submit(*args)
+        except Exception as e:
+            self._fail(job_id, job_dir, f"Could not start job: {e}")
+            raise
+        future.add_done_callback(lambda f: self._check_crash(f, job_id, job_dir))
+        return job_id
+
+    def _check_crash(self, future, job_id, job_dir):
+        """run_job records its own errors; this catches the job process dying outright"""
+        if future.cancelled() or not isinstance(future.exception(), BrokenProcessPool):
+            return
+        self._pool = None
+        job = self.store.get(job_id)
+        if job and job['status'] not in ('finished', 'failed'):
+            self._fail(job_id, job_dir, 'Job process exited unexpectedly')
+
+    def _fail(self, job_id, job_dir, error):
+        self.store.update(job_id, status='failed', error=error)
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+    def _executor(self):
+        if self._pool is None or self._pid != os.getpid():
+            # spawn rather than fork: the web worker may already hold torch and batching threads
+            context = multiprocessing.get_context('spawn')
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            self._pid = os.getpid()
+        return self._pool
+
+_pipeline = None
+
+def _get_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        from similarity.text_analyzer import TextAnalyzer
+        from similarity.code_analyzer import CodeAnalyzer
+        from utils.file_processor import FileProcessor
+        _pipeline = AnalysisPipeline(FileProcessor(), TextAnalyzer(), CodeAnalyzer())
+    return _pipeline
+
+def run_job(db_path, job_id, job_dir, file1_name, file2_name):
+    """Job process entry point: run the analysis pipeline and record progress as it goes"""
+    store = JobStore(db_path)
+    stages = AnalysisPipeline.STAGES
+
+    def progress(stage):
+        store.update(job_id, status='running', stage=stage, progress=stages.index(stage) / (len(stages) - 1))
+
+    try:
+        with open(os.path.join(job_dir, 'file1'), 'rb') as f1, open(os.path.join(job_dir, 'file2'), 'rb') as f2:
+            payload = _get_pipeline().run(
+                FileStorage(stream=f1, filename=file1_name),
+                FileStorage(stream=f2, filename=file2_name),
+                progress
+            )
+        store.update(job_id, status='finished', stage='done', progress=1.0, result=payload)
+    except Exception as e:
+        store.update(job_id, status='failed', error=str(e))
+    finally:
+        shutil.rmtree(job_dir, ignore_errors=True)
@@ -4,70 +4,138 @@ nltk.data.path.append('./nltk_data')  # This makes it use your local folder
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize, sent_tokenize
 from nltk.stem import WordNetLemmatizer
+from sklearn.feature_extraction.text import TfidfVectorizer
+from collections import Counter
+from functools import cached_property, lru_cache
+from config import Config
+from utils.caching import sized_lru_cache
+import math
 import string
 import re
 
+URL_PATTERN = re.compile(r'http\S+|www\S+|https\S+', flags=re.MULTILINE)
+PUNCTUATION = str.maketrans('', '', string.punctuation)
+
+# Same tokens, stop words and 1-2 grams as the per-call vectorizer key phrases used to fit
+_phrase_analyzer = TfidfVectorizer(ngram_range=(1, 2), stop_words='english').build_analyzer()
+
+_lemmatizer = WordNetLemmatizer()
+
+@lru_cache(maxsize=Config.LEMMA_CACHE_SIZE)
+def lemmatize(token):
+    return _lemmatizer.lemmatize(token)
+
+class TextDocument:
+    """One tokenization of a text, shared by preprocessing, key phrases and readability.
+
+    sentences -> words (readability), sentences -> sentence_terms (key phrases)
+    clean_tokens -> lemmas (preprocessing)
+    """
+    def __init__(self, text):
+        self.text = text
+
+    @cached_property
+    def sentences(self):
+        return sent_tokenize(self.text)
+
+    @cached_property
+    def words(self):
+        # word_tokenize splits into sentences first; reuse the ones we already have
+        return [word for sentence in self.sentences for word in word_tokenize(sentence, preserve_line=True)]
+
+    @cached_property
+    def sentence_terms(self):
+        return [Counter(_phrase_analyzer(sentence)) for sentence in self.sentences]
+
+    @cached_property
+    def clean_tokens(self):
+        """Lowercase words with URLs and punctuation stripped.
+
+        Without punctuation word_tokenize reduces to a whitespace split (bar its
+        splitting of a few words like "cannot"), so this skips the sentence
+        tokenizer entirely.
+        """
+        text = URL_PATTERN.sub('', self.text.lower())
+        return text.translate(PUNCTUATION).split()
+
+    def lemmas(self, stop_words):
+        return [lemmatize(token) for token in self.clean_tokens if token not in stop_words and token.isalpha()]
+
+    def key_phrases(self, num_phrases=5):
+        """Terms with the highest TF-IDF summed over sentences, as TfidfVectorizer would rank them"""
+        df = Counter(term for terms in self.sentence_terms for term in terms)
+        if not df:
+            return []
+        n = len(self.sentence_terms)
+        idf = {term: math.log((1 + n) / (1 + count)) + 1 for term, count in df.items()}
+        scores = Counter()
+        for terms in self.sentence_terms:
+            weights = {term: count * idf[term] for term, count in terms.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values()))
+            for term, weight in weights.items():
+                scores[term] += weight / norm
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [term for term, _ in ranked[:num_phrases]]
+
+    def readability(self, count_syllables):
+        num_sentences = len(self.sentences)
+        num_words = len(self.words)
+        if num_sentences == 0 or num_words == 0:
+            return 0
+        num_syllables = sum(count_syllables(word) for word in self.words)
+        return 206.835 - 1.015 * (num_words / num_sentences) - 84.6 * (num_syllables / num_words)
+
+# Words, sentence terms and clean tokens hold about 40 bytes per character
+@sized_lru_cache(Config.DOCUMENT_CACHE_MAX_BYTES, bytes_per_char=64)
+def text_document(text):
+    return TextDocument(text)
+
 class NLPPipeline:
     def __init__(self):
-        self.lemmatizer = WordNetLemmatizer()
+        self.lemmatizer = _lemmatizer
         self.stop_words = set(stopwords.words('english'))
         
     def preprocess_text(self, text, language='english'):
         """
         Clean and preprocess text for analysis
         """
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove URLs
-        text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
-        
-        # Remove punctuation
-        text = text.translate(str.maketrans('', '', string.punctuation))
-        
-        # Tokenize
-        tokens = word_tokenize(text)
-        
-        # Remove stopwords and lemmatize
-        processed_tokens = [
-            self.lemmatizer.lemmatize(token)
-            for token in tokens
-            if token not in self.stop_words and token.isalpha()
-        ]
-        
-        return ' '.join(processed_tokens)
+        return ' '.join(text_document(text).lemmas(self.stop_words))
     
     def extract_key_phrases(self, text, num_phrases=5):
         """
         Extract important key phrases using TF-IDF
         """
-        from sklearn.feature_extraction.text import TfidfVectorizer
-        
-        sentences = sent_tokenize(text)
-        vectorizer = TfidfVectorizer(ngram_range=(1, 2), stop_words='english')
-        X = vectorizer.fit_transform(sentences)
-        
-        # Get top phrases
-        feature_array = vectorizer.get_feature_names_out()
-        tfidf_sorting = X.sum(axis=0).A1.argsort()[::-1]
-        
-        return [feature_array[i] for i in tfidf_sorting[:num_phrases]]
+        return text_document(text).key_phrases(num_phrases)
     
     def calculate_readability(self, text):
         """
         Calculate Flesch Reading Ease score
         """
-        sentences = sent_tokenize(text)
-        words = word_tokenize(text)
-        
-        num_sentences = len(sentences)
-        num_words = len(words)
-        num_syllables = sum(self._count_syllables(word) for word in words)
-        
-        if num_sentences == 0 or num_words == 0:
-            return 0
-            
-        return 206.835 - 1.015 * (num_words / num_sentences) - 84.6 * (num_syllables / num_words)
+        return text_document(text).readability(self._count_syllables)
+    
+    def analyze(self, text, num_phrases=5, preprocess=False):
+        """
+        Key phrases and readability from one tokenization; with preprocess,
+        also the lemmatized text (this needs the WordNet corpus)
+        """
+        document = text_document(text)
+        result = {
+            'key_phrases': document.key_phrases(num_phrases),
+            'readability': document.readability(self._count_syllables)
+        }
+        if preprocess:
+            result['preprocessed'] = ' '.join(document.lemmas(self.stop_words))
+        return result
+    
+    def analyze_many(self, texts, num_phrases=5, preprocess=False):
+        """
+        Analyze a batch of documents; repeated texts are analyzed once
+        """
+        results = {}
+        for text in texts:
+            if text not in results:
+                results[text] = self.analyze(text, num_phrases, preprocess)
+        return [results[text] for text in texts]
     
     def _count_syllables(self, word):
         """
@@ -0,0 +1,69 @@
+from datetime import datetime
+from utils.instrumentation import REQUESTS
+
+CODE_TYPES = ('python', 'java', 'cpp')
+
+class AnalysisPipeline:
+    """Extraction plus text/code comparison, shared by the web routes and background jobs"""
+    STAGES = ('queued', 'extracting', 'metrics', 'heatmap', 'matches', 'done')
+
+    def __init__(self, file_processor, text_analyzer, code_analyzer):
+        self.file_processor = file_processor
+        self.text_analyzer = text_analyzer
+        self.code_analyzer = code_analyzer
+
+    def compare(self, content1, content2, file_type, progress=None, cascade=None):
+        if file_type in CODE_TYPES:
+            if progress:
+                progress('metrics')
+            return self.code_analyzer.compare(content1, content2, file_type)
+        return self.text_analyzer.compare(content1, content2, progress=progress, cascade=cascade)
+
+    def compare_many(self, items, cascade=None):
+        """Compare (content1, content2, file_type) items; text pairs share semantic batches.
+
+        A pair that fails gets its exception in place of a result, so one bad
+        document does not fail the pairs compared with it.
+        """
+        results = [None] * len(items)
+        text = [k for k, (_, _, file_type) in enumerate(items) if file_type not in CODE_TYPES]
+        try:
+            scored = self.text_analyzer.compare_many([items[k][:2] for k in text], cascade=cascade)
+        except Exception:
+            # Compare them alone so only the failing pairs get the error
+            scored = [self._try_compare(*items[k], cascade=cascade) for k in text]
+        for k, result in zip(text, scored):
+            results[k] = result
+        for k, (content1, content2, file_type) in enumerate(items):
+            if file_type in CODE_TYPES:
+                results[k] = self._try_compare(content1, content2, file_type)
+        return results
+
+    def _try_compare(self, content1, content2, file_type, cascade=None):
+        try:
+            return self.compare(content1, content2, file_type, cascade=cascade)
+        except Exception as e:
+            return e
+
+    def run(self, file1, file2, progress=None, cascade=None):
+        """Analyze two uploads and build the /analyze response payload"""
+        if progress:
+            progress('extracting')
+        file_type = 'unknown'
+        try:
+            content1, content2, file_type = self.file_processor.process_files(file1, file2)
+            results = self.compare(content1, content2, file_type, progress, cascade)
+        except Exception:
+            REQUESTS.inc(file_type=file_type, status='error')
+            raise
+        REQUESTS.inc(file_type=file_type, status='success')
+        return {
+            'success': True,
+            'results': results,
+            'file1_name': file1.filename,
+            'file2_name': file2.filename,
+            'file1_preview': content1[:500] + ('...' if len(content1) > 500 else ''),
+            'file2_preview': content2[:500] + ('...' if len(content2) > 500 else ''),
+            'timestamp': datetime.now().isoformat(),
+            'type': file_type
+        }
@@ -0,0 +1,159 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+from flask import request
+from config import Config
+
+CAPTURE_ID = re.compile(r'^[0-9]{8}T[0-9]{12}-[0-9a-f]{8}$')
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval into folded stacks.
+
+    The output is the "folded" format read by flamegraph.pl and speedscope:
+    one line per distinct stack, root first, with its sample count.
+    """
+    def __init__(self, thread_id, interval=Config.PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+class ProfileStore:
+    """Saved captures: <id>.folded holds the stacks, <id>.json the request details"""
+    def __init__(self, folder=Config.PROFILE_FOLDER, keep=Config.PROFILE_KEEP):
+        self.folder = folder
+        self.keep = keep
+
+    def save(self, meta, stacks):
+        os.makedirs(self.folder, exist_ok=True)
+        capture_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+        meta = dict(meta, id=capture_id, samples=sum(stacks.values()), hot_frames=self._hot_frames(stacks))
+        with open(os.path.join(self.folder, f"{capture_id}.folded"), 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(os.path.join(self.folder, f"{capture_id}.json"), 'w') as f:
+            json.dump(meta, f)
+        self._prune()
+        return capture_id
+
+    def list(self):
+        captures = []
+        for name in sorted(os.listdir(self.folder), reverse=True) if os.path.isdir(self.folder) else []:
+            if name.endswith('.json'):
+                with open(os.path.join(self.folder, name)) as f:
+                    captures.append(json.load(f))
+        return captures
+
+    def path(self, capture_id):
+        """Path of a capture's folded stacks, or None for an unknown or malformed id"""
+        if not CAPTURE_ID.match(capture_id):
+            return None
+        path = os.path.join(self.folder, f"{capture_id}.folded")
+        return path if os.path.exists(path) else None
+
+    def _hot_frames(self, stacks, limit=10):
+        """Functions that were on top of the stack most often, with their share of samples"""
+        total = sum(stacks.values())
+        leaves = Counter()
+        for stack, count in stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return [{'frame': frame, 'share': count / total} for frame, count in leaves.most_common(limit)]
+
+    def _prune(self):
+        ids = sorted(name[:-len('.json')] for name in os.listdir(self.folder) if name.endswith('.json'))
+        for capture_id in ids[:-self.keep]:
+            for ext in ('.json', '.folded'):
+                try:
+                    os.remove(os.path.join(self.folder, capture_id + ext))
+                except OSError:
+                    pass
+
+class RequestProfiler:
+    """Opt-in sampling profiler for Flask views.
+
+    When enabled, a request is profiled if it sends `X-Profile: 1`, or, with
+    slow_seconds set, every request is sampled and kept only if it took longer.
+    """
+    def __init__(self, store, enabled=Config.PROFILING_ENABLED, slow_seconds=Config.PROFILE_SLOW_SECONDS,
+                 interval=Config.PROFILE_SAMPLE_INTERVAL):
+        self.store = store
+        self.enabled = enabled
+        self.slow_seconds = slow_seconds
+        self.interval = interval
+
+    def profiled(self, view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return view(*args, **kwargs)
+            forced = request.headers.get('X-Profile', '').lower() in ('1', 'true')
+            if not forced and self.slow_seconds is None:
+                return view(*args, **kwargs)
+
+            meta = self._request_meta()
+            sampler = StackSampler(threading.get_ident(), self.interval).start()
+            start = time.perf_counter()
+            response = None
+            try:
+                response = view(*args, **kwargs)
+                return response
+            finally:
+                stacks = sampler.stop()
+                elapsed = time.perf_counter() - start
+                if forced or elapsed >= self.slow_seconds:
+                    meta.update(
+                        seconds=elapsed,
+                        trigger='header' if forced else 'slow',
+                        file_type=meta.get('file_type') or self._response_file_type(response)
+                    )
+                    self.store.save(meta, stacks)
+        return wrapper
+
+    def _request_meta(self):
+        files = {}
+        for field, upload in request.files.items():
+            upload.stream.seek(0, os.SEEK_END)
+            files[field] = {'name': upload.filename, 'bytes': upload.stream.tell()}
+            upload.stream.seek(0)
+        payload = request.get_json(silent=True) if request.is_json else None
+        return {
+            'endpoint': request.endpoint,
+            'timestamp': datetime.now().isoformat(),
+            'content_length': request.content_length,
+            'files': files,
+            'file_type': payload.get('type') if isinstance(payload, dict) else None
+        }
+
+    def _response_file_type(self, response):
+        if isinstance(response, tuple):
+            response = response[0]
+        data = response.get_json(silent=True) if hasattr(response, 'get_json') else None
+        return data.get('type') if isinstance(data, dict) else None
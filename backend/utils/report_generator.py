@@ -2,18 +2,67 @@ from fpdf import FPDF
 from datetime import datetime
 from config import Config
 import os
+import hashlib
+import json
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from utils.nlp_utils import NLPPipeline
 
+_worker_generator = None
+
+def _render_report(analysis_data):
+    """Pool worker: render one report with a per-process generator"""
+    global _worker_generator
+    if _worker_generator is None:
+        _worker_generator = ReportGenerator()
+    return _worker_generator.render(analysis_data)
+
+def payload_digest(analysis_data):
+    """SHA-256 of the canonical JSON form of an analysis payload"""
+    canonical = json.dumps(analysis_data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
 class ReportGenerator:
-    def __init__(self):
+    def __init__(self, cache_size=Config.REPORT_CACHE_SIZE, workers=Config.REPORT_WORKERS):
         self.nlp = NLPPipeline()
         self.report_font = 'Arial'
         self.primary_color = (67, 97, 238)  # #4361ee
         self.secondary_color = (63, 55, 201)  # #3f37c9
-        
+        self.cache_size = cache_size
+        self.workers = workers
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+    
     def generate(self, analysis_data):
         """
-        Generate comprehensive PDF report from analysis data
+        PDF report bytes for an analysis payload; repeated exports of the same payload are served from cache
+        """
+        digest = payload_digest(analysis_data)
+        cached = self._cached(digest)
+        if cached is None:
+            cached = self._store(digest, self.render(analysis_data))
+        return cached
+    
+    def generate_many(self, payloads):
+        """Reports for many payloads, rendering the uncached ones on a process pool"""
+        digests = [payload_digest(data) for data in payloads]
+        reports = {digest: self._cached(digest) for digest in digests}
+        missing = {digest: data for digest, data in zip(digests, payloads) if reports[digest] is None}
+        if len(missing) > 1:
+            rendered = self._executor().map(_render_report, missing.values())
+        else:
+            rendered = map(self.render, missing.values())
+        for digest, pdf in zip(missing, rendered):
+            reports[digest] = self._store(digest, pdf)
+        return [reports[digest] for digest in digests]
+    
+    def render(self, analysis_data):
+        """
+        Render a comprehensive PDF report from analysis data into memory
         """
         pdf = FPDF()
         pdf.set_auto_page_break(auto=True, margin=15)
@@ -42,13 +91,35 @@ class ReportGenerator:
             pdf.add_page()
             self._add_matches_page(pdf, analysis_data)
         
-        # Save the PDF
-        os.makedirs('reports', exist_ok=True)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        report_path = f"reports/report_{timestamp}.pdf"
-        pdf.output(report_path)
+        # Add longest common substrings if they were computed
+        if analysis_data['results'].get('common_substrings'):
+            pdf.add_page()
+            self._add_common_substrings_page(pdf, analysis_data)
         
-        return report_path
+        # FPDF 1.7 returns the document as a latin-1 string
+        return pdf.output(dest='S').encode('latin-1')
+    
+    def _cached(self, digest):
+        with self._cache_lock:
+            if digest in self._cache:
+                self._cache.move_to_end(digest)
+                return self._cache[digest]
+        return None
+    
+    def _store(self, digest, pdf):
+        with self._cache_lock:
+            self._cache[digest] = pdf
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return pdf
+    
+    def _executor(self):
+        if self._pool is None or self._pool_pid != os.getpid():
+            context = multiprocessing.get_context('spawn')
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            self._pool_pid = os.getpid()
+        return self._pool
     
     def _add_cover_page(self, pdf, data):
         pdf.add_page()
@@ -130,7 +201,7 @@ class ReportGenerator:
         ]
         
         for finding in findings:
-            pdf.cell(0, 8, "• " + finding, 0, 1)
+            pdf.cell(0, 8, "- " + finding, 0, 1)
     
     def _add_detailed_analysis(self, pdf, data):
         pdf.set_font(self.report_font, 'B', 18)
@@ -167,8 +238,8 @@ class ReportGenerator:
             pdf.cell(0, 10, "Text Analysis Insights:", 0, 1)
             
             combined_text = data['file1_preview'] + " " + data['file2_preview']
-            key_phrases = self.nlp.extract_key_phrases(combined_text)
-            readability = self.nlp.calculate_readability(combined_text)
+            insights = self.nlp.analyze(combined_text)
+            key_phrases, readability = insights['key_phrases'], insights['readability']
             
             pdf.set_font(self.report_font, '', 12)
             pdf.cell(0, 8, "Key phrases found in documents:", 0, 1)
@@ -223,6 +294,32 @@ class ReportGenerator:
             pdf.multi_cell(0, 6, data['file2_preview'][match['text2_start']:match['text2_end']], 0, 1)
             pdf.ln(8)
     
+    def _add_common_substrings_page(self, pdf, data):
+        pdf.set_font(self.report_font, 'B', 18)
+        pdf.set_text_color(*self.primary_color)
+        pdf.cell(0, 10, "Longest Common Passages", 0, 1)
+        pdf.ln(10)
+        
+        pdf.set_font(self.report_font, '', 12)
+        pdf.multi_cell(0, 8, "Verbatim passages that appear in both documents, longest first:", 0, 1)
+        pdf.ln(5)
+        
+        for i, substring in enumerate(data['results']['common_substrings']):
+            if pdf.get_y() > 250:  # Prevent overflow
+                pdf.add_page()
+                pdf.set_y(20)
+            
+            pdf.set_font(self.report_font, 'B', 12)
+            pdf.cell(0, 8, f"Passage #{i+1} - {substring['length']} characters", 0, 1)
+            
+            pdf.set_font(self.report_font, '', 10)
+            pdf.multi_cell(0, 6, f"File 1 position {substring['text1_start']}-{substring['text1_end']}, "
+                                 f"File 2 position {substring['text2_start']}-{substring['text2_end']}", 0, 1)
+            preview = data['file1_preview'][substring['text1_start']:substring['text1_end']]
+            if preview:
+                pdf.multi_cell(0, 6, preview, 0, 1)
+            pdf.ln(5)
+    
     def _add_score_indicator(self, pdf, score):
         pdf.set_font(self.report_font, 'B', 16)
         pdf.cell(0, 10, f"Overall Similarity Score: {score*100:.1f}%", 0, 1, 'C')
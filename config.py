@@ -6,14 +6,83 @@ class Config:
     ALLOWED_EXTENSIONS = {'txt', 'pdf', 'docx', 'py', 'java', 'cpp', 'c', 'h'}
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     
+    # PDF extraction settings
+    PDF_CACHE_FOLDER = 'cache/pdf'
+    PDF_CACHE_MAX_BYTES = 256 * 1024 * 1024  # least recently used texts are evicted beyond this
+    PDF_CACHE_MAX_AGE = 7 * 24 * 3600  # seconds
+    PDF_MAX_BYTES = 16 * 1024 * 1024
+    PDF_MAX_PAGES = 1000
+    PDF_PARALLEL_MIN_PAGES = 20  # smaller PDFs are extracted in-process
+    PDF_WORKERS = os.cpu_count() or 2
+    
     # Analysis settings
     MINHASH_PERMUTATIONS = 128
+    MINHASH_SHINGLE_SIZE = 3  # words per shingle in the minhash metric
     HEATMAP_WINDOW_SIZE = 100
+    HEATMAP_RESOLUTION = 20  # grid cells per side; None for one cell per window
     MIN_MATCH_LENGTH = 50
+    MATCH_KGRAM_SIZE = 20
+    MATCH_WINNOW_WINDOW = 16
+    MATCH_MAX_GAP = 20
+    LEVENSHTEIN_MIN_SIMILARITY = 0.3  # below this the exact edit distance is not computed
+    LEVENSHTEIN_EXACT_MAX_LENGTH = 50000  # longer documents use the chunked approximation
+    LEVENSHTEIN_CHUNK_SIZE = 5000
+    # Tiered text scoring: later tiers run only while a pair still looks suspicious
+    TEXT_CASCADE = os.environ.get('TEXT_CASCADE', '').lower() in ('1', 'true', 'yes')
+    CASCADE_LEXICAL_THRESHOLD = 0.1  # max(jaccard, minhash) needed to run TF-IDF cosine
+    CASCADE_DETAILED_THRESHOLD = 0.25  # cosine needed to run the expensive metrics
+    LCS_TOP_N = 5  # longest common substrings listed in a text report
+    LCS_MIN_LENGTH = 20
+    LCS_EXACT_MAX_LENGTH = 20000  # longer texts use the anchored search instead of the exact automaton
+    LCS_ANCHOR_SIZE = 20  # the anchored search finds every common substring of 2x this or longer
+    GST_MIN_MATCH = 9  # shortest token run reported as a code match
+    GST_INITIAL_SEARCH = 20
+    LOGIC_NGRAM_SIZE = 2  # normalized tokens per n-gram in the code logic similarity
+    AST_MIN_SUBTREE_SIZE = 4  # smaller subtrees are too common to signal copying
+    PARSE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # estimated memory of parsed submissions kept per cache and process
+    DOCUMENT_CACHE_MAX_BYTES = 64 * 1024 * 1024  # same for text documents' derived tokens and vectors
+    LEMMA_CACHE_SIZE = 50000  # distinct tokens whose lemma is memoized per process
+    LIBCLANG_PATH = os.environ.get('LIBCLANG_PATH')
+    CPP_PARSE_ARGS = ['-x', 'c++', '-std=c++17']
+    CPP_WORKERS = os.cpu_count() or 2
+    SEMANTIC_MODEL = 'cross-encoder/stsb-roberta-large'
+    # Load the model at import so a preloading gunicorn master shares it with its workers
+    PRELOAD_MODEL = os.environ.get('PRELOAD_MODEL', '').lower() in ('1', 'true', 'yes')
+    SEMANTIC_MAX_BATCH_SIZE = 16
+    SEMANTIC_MAX_WAIT = 0.01  # seconds a request waits for others to share its batch
+    
+    # Corpus settings
+    CORPUS_DB = 'corpus/corpus.sqlite3'
+    CORPUS_PATH = 'corpus/index.pkl'  # pickled index of earlier versions, imported once
+    CORPUS_LSH_THRESHOLD = 0.1
+    CORPUS_SHINGLE_SIZE = 3
+    CORPUS_TOP_K = 5
+    
+    # Background job settings
+    JOBS_DB = 'jobs/jobs.sqlite3'
+    JOB_WORKERS = 2
+    JOB_POLL_INTERVAL = 0.5  # seconds between progress checks when streaming events
+    JOB_EVENTS_TIMEOUT = 600  # seconds without progress before an event stream gives up
+    
+    # Batch scan settings (batch_scan.py)
+    BATCH_WORKERS = os.cpu_count() or 2
+    BATCH_CHUNK_SIZE = 64  # pairs compared per worker task
+    MATRIX_MEMORY_BUDGET = 256 * 1024 * 1024  # peak bytes per block of rows in --matrix screening
+    CODE_SCREEN_KGRAM_SIZE = 9  # normalized tokens per shingle when code is screened by MinHash (--matrix, corpus)
+    CODE_SCREEN_THRESHOLD = 0.05  # estimated k-gram Jaccard that flags a code pair
+    
+    # Profiling settings
+    PROFILING_ENABLED = os.environ.get('PROFILING', '').lower() in ('1', 'true', 'yes')
+    PROFILE_SLOW_SECONDS = float(os.environ['PROFILE_SLOW_SECONDS']) if os.environ.get('PROFILE_SLOW_SECONDS') else None
+    PROFILE_SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+    PROFILE_FOLDER = 'profiles'
+    PROFILE_KEEP = 50  # most recent captures kept on disk
     
     # PDF report settings
     REPORT_TITLE = "Plagiarism Analysis Report"
     REPORT_AUTHOR = "Plagiarism Detector"
+    REPORT_CACHE_SIZE = 64  # rendered reports kept in memory, keyed by payload hash
+    REPORT_WORKERS = os.cpu_count() or 2
     
     # Create required directories
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
\ No newline at end of file
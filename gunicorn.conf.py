@@ -0,0 +1,13 @@
+import gc
+import os
+
+# With PRELOAD_MODEL set the app (and the cross-encoder) is imported once in the
+# master, and forked workers share the weights through copy-on-write.
+# Read the variable directly, like config.py does: gunicorn loads this file before
+# the project directory is on sys.path, and PyPI's `config` package could shadow ours
+preload_app = os.environ.get('PRELOAD_MODEL', '').lower() in ('1', 'true', 'yes')
+
+def when_ready(server):
+    if preload_app:
+        # Keep the garbage collector from touching (and so copying) preloaded objects
+        gc.freeze()